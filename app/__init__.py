@@ -1,23 +1,68 @@
+import os
+
+import click
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_bootstrap import Bootstrap
 from flask_moment import Moment
-import os
+from app.cache import Cache
+from app.engine import RoutingSession, configure_engines
+from app.profiling import RequestProfiler
+from app.security import PasswordHasher
+from app.assets import AssetManifest
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+login = LoginManager()
+login.login_view = 'auth.login'
+bootstrap = Bootstrap()
+moment = Moment()
+cache = Cache()
+profiler = RequestProfiler()
+password_hasher = PasswordHasher()
+assets = AssetManifest()
+
+
+def create_app(config_class=Config):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    if app.config.get('JINJA_BYTECODE_CACHE_DIR'):
+        os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])
 
-app = Flask(__name__)
-app.config.from_object(Config)
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-login = LoginManager(app)
-login.login_view = 'login'
-bootstrap = Bootstrap(app)
-moment = Moment(app)
+    db.init_app(app)
+    configure_engines(app, db)
+    login.init_app(app)
+    bootstrap.init_app(app)
+    moment.init_app(app)
+    cache.init_app(app)
+    profiler.init_app(app)
+    password_hasher.init_app(app)
+    assets.init_app(app)
 
+    if click.get_current_context(silent=True) is not None:
+        # Flask-Migrate pulls in alembic, which is only needed for `flask db`,
+        # so web workers skip it.
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
-from app import routes, models
+    from app import models
+    app.extensions['wage_index'] = models.WageIndexCache()
+    from app.auth import bp as auth_bp
+    from app.rota import bp as rota_bp
+    from app.admin import bp as admin_bp
+    from app.assets import bp as assets_bp
+    from app.cli import shifts_cli, auth_cli, assets_cli, worker_command
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(rota_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(assets_bp)
+    app.cli.add_command(shifts_cli)
+    app.cli.add_command(auth_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(worker_command)
 
-if __name__ == '__main__':
-    app.run(debug=True, port=os.getenv("PORT", default=5000))
+    return app
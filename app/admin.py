@@ -0,0 +1,102 @@
+from flask import Blueprint, render_template, flash, redirect, url_for, abort, jsonify
+from flask_login import current_user, login_required
+from sqlalchemy.exc import IntegrityError
+
+from app import db, cache, profiler
+from app.auth import requires_role
+from app.forms import NewEmployeeForm, NewBusinessForm, NewWageForm, NewUserRoleForm
+from app.models import Employee, Business, UserRoles, user_roles_cache_key
+from app.choices import business_choices, employee_choices
+from app.versions import GLOBAL_SCOPE, bump, business_scope
+from app.wages import add_employee, add_wage, commit_wage_change
+
+bp = Blueprint('admin', __name__)
+
+
+@bp.route('/new_employee', methods=['GET', 'POST'])
+@login_required
+@requires_role('Manager')
+def new_employee():
+    form = NewEmployeeForm()
+    if form.validate_on_submit():
+        try:
+            employee = add_employee(form.firstname.data, form.lastname.data, form.hourly_rate.data)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            form.check_unique()
+            return render_template('new_employee.html', title='New employee', form=form)
+        employee_choices.invalidate()
+
+        flash(f'New employee, {employee.firstname} {employee.lastname}, successfully added!')
+        return redirect(url_for('admin.new_employee'))
+    return render_template('new_employee.html', title='New employee', form=form)
+
+
+@bp.route('/new_business', methods=['GET', 'POST'])
+@login_required
+@requires_role('Manager')
+def new_business():
+    form = NewBusinessForm()
+    if form.validate_on_submit():
+        business = Business(name=form.name.data)
+        db.session.add(business)
+        try:
+            db.session.flush()
+            bump(GLOBAL_SCOPE, business_scope(business.id))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            form.check_unique()
+            return render_template('new_business.html', title='New business', form=form)
+        business_choices.invalidate()
+        flash(f'New business, {business.name}, successfully added!')
+        return redirect(url_for('admin.new_business'))
+    return render_template('new_business.html', title='New business', form=form)
+
+
+@bp.route('/new_wage/<int:employee_id>', methods=['GET', 'POST'])
+@login_required
+@requires_role('Manager')
+def new_wage(employee_id):
+    form = NewWageForm()
+    e = Employee.query.filter_by(id=employee_id).first()
+    form.employee_id.choices = [(e.id, f'{e.firstname} {e.lastname}')]
+    if form.validate_on_submit():
+        commit_wage_change(lambda: add_wage(employee_id,
+                                            hourly_rate=form.hourly_rate.data,
+                                            valid_from=form.valid_from.data,
+                                            valid_to=form.valid_to.data,
+                                            is_current=form.is_current.data,
+                                            background=True,
+                                            user_id=current_user.id))
+        flash(f'Wage successfully updated! Labour costs are being recalculated in the background.')
+        return redirect(url_for('admin.new_wage', employee_id=employee_id))
+    return render_template('new_wage.html', title='New wage', form=form)
+
+
+@bp.route('/new_user_roles', methods=['GET', 'POST'])
+@login_required
+@requires_role()
+def new_user_roles():
+    form = NewUserRoleForm()
+
+    if form.validate_on_submit():
+        user_role = UserRoles(user_id=form.user_id.data,
+                      role_id=form.role_id.data)
+        db.session.add(user_role)
+        db.session.commit()
+        cache.delete(user_roles_cache_key(form.user_id.data))
+        flash(f'New user role successfully added!')
+        return redirect(url_for('admin.new_user_roles'))
+    
+    return render_template('new_user_role.html', title='New user role', form=form)
+
+
+@bp.route('/_debug/requests')
+@login_required
+@requires_role()
+def debug_requests():
+    if not profiler.enabled:
+        abort(404)
+    return jsonify(requests=list(reversed(profiler.recent)))
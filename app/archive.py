@@ -0,0 +1,69 @@
+from datetime import date, datetime, time
+
+from sqlalchemy import and_, delete, func, insert, select, union_all
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models import Shift, ShiftArchive
+
+# Columns shift and shift_archive share, in the same order.
+SHIFT_COLUMNS = ('id', 'employee_id', 'business_id', 'start_time', 'finish_time')
+
+
+def archive_horizon():
+    """Start of the latest archived shift, or None while nothing is archived.
+
+    One lookup on ix_shift_archive_start_time.
+    """
+    return db.session.query(func.max(ShiftArchive.start_time)).scalar()
+
+
+def all_shifts():
+    """A Shift alias over hot and archived shifts alike (a UNION ALL of both tables).
+
+    Filters on the alias are pushed into both halves of the union, so each
+    table is still read through its own indexes.
+    """
+    union = union_all(select(*[getattr(Shift, column) for column in SHIFT_COLUMNS]),
+                      select(*[getattr(ShiftArchive, column) for column in SHIFT_COLUMNS])).subquery('all_shifts')
+    return aliased(Shift, union)
+
+
+def shift_source(since=None):
+    """The entity to read shifts starting from `since` (a date or datetime) with.
+
+    Plain Shift when nothing from `since` on has been archived, which covers
+    the recent periods most views ask for; all_shifts() when the range
+    reaches into the archive or has no lower bound. Query the result like
+    Shift (`shift.start_time`, `shift.business`, ...). New shifts are always
+    written to Shift.
+    """
+    horizon = archive_horizon()
+    if horizon is None:
+        return Shift
+    if since is not None:
+        if not isinstance(since, datetime):
+            since = datetime.combine(since, time.min)
+        if since > horizon:
+            return Shift
+    return all_shifts()
+
+
+def archive_shifts(before):
+    """Move every shift starting before `before` into shift_archive; returns how many moved.
+
+    Rows keep their ids, and the labour cost summary doesn't change since
+    it is built from both tables. Nothing is committed.
+    """
+    if isinstance(before, date) and not isinstance(before, datetime):
+        before = datetime.combine(before, time.min)
+    moving = Shift.start_time < before
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite numbers new rows from the highest id left in the table, so
+        # moving the newest row would let its id be handed out again.
+        moving = and_(moving, Shift.id < select(func.max(Shift.id)).scalar_subquery())
+    db.session.flush()
+    db.session.execute(insert(ShiftArchive).from_select(
+        list(SHIFT_COLUMNS), select(*[getattr(Shift, column) for column in SHIFT_COLUMNS]).where(moving)))
+    return db.session.execute(delete(Shift).where(moving), execution_options={'synchronize_session': False}) \
+        .rowcount
@@ -0,0 +1,260 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+from importlib import resources
+
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('assets', __name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+# Third-party assets by logical name: (source, CDN URL used until the asset is built).
+# A `package:path` source is read from an installed package; a URL is fetched
+# into ASSETS_VENDOR_DIR on the first build that can reach it. Builds without
+# network access need that directory copied or committed beforehand.
+ASSET_SOURCES = {
+    'bootstrap/css/bootstrap.min.css': (
+        'flask_bootstrap:static/css/bootstrap.min.css',
+        'https://cdnjs.cloudflare.com/ajax/libs/twitter-bootstrap/3.3.7/css/bootstrap.min.css'),
+    'bootstrap/js/bootstrap.min.js': (
+        'flask_bootstrap:static/js/bootstrap.min.js',
+        'https://cdnjs.cloudflare.com/ajax/libs/twitter-bootstrap/3.3.7/js/bootstrap.min.js'),
+    'jquery/jquery.min.js': (
+        'flask_bootstrap:static/jquery.min.js',
+        'https://cdnjs.cloudflare.com/ajax/libs/jquery/1.12.4/jquery.min.js'),
+    'moment/moment-with-locales.min.js': (
+        'https://cdn.jsdelivr.net/npm/moment@2.29.4/min/moment-with-locales.min.js',
+        'https://cdn.jsdelivr.net/npm/moment@2.29.4/min/moment-with-locales.min.js'),
+    'gridjs/gridjs.umd.js': (
+        'https://unpkg.com/gridjs@6.0.6/dist/gridjs.umd.js',
+        'https://unpkg.com/gridjs@6.0.6/dist/gridjs.umd.js'),
+    'gridjs/theme/mermaid.min.css': (
+        'https://unpkg.com/gridjs@6.0.6/dist/theme/mermaid.min.css',
+        'https://unpkg.com/gridjs@6.0.6/dist/theme/mermaid.min.css'),
+}
+# Referenced from bootstrap.min.css; its url()s are rewritten to the fingerprinted names.
+ASSET_SOURCES.update({
+    f'bootstrap/fonts/glyphicons-halflings-regular.{ext}': (
+        f'flask_bootstrap:static/fonts/glyphicons-halflings-regular.{ext}', None)
+    for ext in ('eot', 'svg', 'ttf', 'woff', 'woff2')
+})
+
+# Types worth precompressing; fonts like woff/woff2 are compressed already.
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml',
+                      'application/vnd.ms-fontobject', 'font/ttf')
+# Content-Encoding -> suffix of the precompressed file, most preferred first.
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+?)\1\s*\)')
+
+
+def _read_source(source):
+    package, _, path = source.partition(':')
+    return resources.files(package).joinpath(path).read_bytes()
+
+
+def vendor_asset(name, vendor_dir, download=True):
+    """Bytes of the asset `name`, fetching a URL source into `vendor_dir` first if needed.
+
+    Returns None when the asset isn't vendored and can't (or may not) be downloaded.
+    """
+    source, _ = ASSET_SOURCES[name]
+    if not source.startswith(('https://', 'http://')):
+        return _read_source(source)
+    path = os.path.join(vendor_dir, name)
+    if not os.path.exists(path):
+        if not download:
+            return None
+        try:
+            with urllib.request.urlopen(source, timeout=30) as response:
+                data = response.read()
+        except OSError as e:
+            logger.warning('could not download %s from %s: %s', name, source, e)
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def fingerprinted_name(name, data):
+    """`dir/name.min.css` -> `dir/name.min.<content hash>.css`."""
+    stem, ext = posixpath.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def _rewrite_css_urls(name, css, manifest):
+    # Relative url()s keep pointing at the same files once both sides are fingerprinted.
+    directory = posixpath.dirname(name)
+
+    def replace(match):
+        quote, ref = match.groups()
+        if ref.startswith(('data:', '/', 'http:', 'https:')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', ref).groups()
+        target = posixpath.normpath(posixpath.join(directory, path))
+        if target not in manifest:
+            return match.group(0)
+        return f'url({quote}{posixpath.relpath(manifest[target], directory)}{suffix}{quote})'
+
+    return _CSS_URL.sub(replace, css.decode('utf-8')).encode('utf-8')
+
+
+def _compressible(name):
+    mimetype = mimetypes.guess_type(name)[0] or ''
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def _write_variants(path, data):
+    """Write `path` with .gz, and .br when the optional `brotli` package is installed."""
+    with open(path, 'wb') as f:
+        f.write(data)
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        # Not worth a variant unless it is actually smaller.
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+class MissingAssets(Exception):
+    """Raised by build_assets when some assets couldn't be vendored."""
+
+    def __init__(self, names):
+        super().__init__(f'not vendored: {", ".join(names)}')
+        self.names = names
+
+
+def build_assets(dist_dir, vendor_dir, download=True, clean=False, allow_missing=False):
+    """Fingerprint every asset into `dist_dir` with precompressed variants and a manifest.
+
+    Files from earlier builds are kept unless `clean`, so pages rendered
+    before a deploy can still load theirs. Raises MissingAssets, before
+    anything is written, when an asset can't be vendored; with
+    `allow_missing` those are left to their CDN instead. Returns (manifest,
+    missing), where `missing` lists the assets left to a CDN.
+    """
+    sources = {name: vendor_asset(name, vendor_dir, download=download) for name in ASSET_SOURCES}
+    missing = sorted(name for name, data in sources.items() if data is None)
+    if missing and not allow_missing:
+        raise MissingAssets(missing)
+
+    if clean and os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    # CSS last, so the files it refers to already have their fingerprinted names.
+    for name in sorted(ASSET_SOURCES, key=lambda name: (name.endswith('.css'), name)):
+        data = sources[name]
+        if data is None:
+            continue
+        if name.endswith('.css'):
+            data = _rewrite_css_urls(name, data, manifest)
+        manifest[name] = fingerprinted_name(name, data)
+        path = os.path.join(dist_dir, manifest[name])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if _compressible(name):
+            _write_variants(path, data)
+        else:
+            with open(path, 'wb') as f:
+                f.write(data)
+    # Written last: until it is replaced, the app keeps serving the previous build.
+    tmp = os.path.join(dist_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(dist_dir, MANIFEST_NAME))
+    return manifest, missing
+
+
+class ManifestState(object):
+    """One app's build manifest, kept in app.extensions['assets']."""
+
+    def __init__(self, dist_dir):
+        self.dist_dir = dist_dir
+        self._manifest = None
+        self._mtime = None
+
+    def manifest(self, reload=False):
+        """The manifest, read on first use; with `reload`, read again whenever the file changes."""
+        path = os.path.join(self.dist_dir, MANIFEST_NAME)
+        if self._manifest is None or reload:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                mtime = None
+            if self._manifest is None or mtime != self._mtime:
+                self._mtime = mtime
+                self._manifest = {}
+                if mtime is not None:
+                    with open(path) as f:
+                        self._manifest = json.load(f)
+        return self._manifest
+
+
+class AssetManifest(object):
+    """Resolves logical asset names to fingerprinted URLs from the build manifest.
+
+    Templates call `asset_url('gridjs/gridjs.umd.js')`. Assets missing from
+    the manifest (nothing built yet, or a download failed) fall back to
+    their CDN URL. Each app reads its own ASSETS_DIST_DIR manifest once, or
+    whenever it changes when the app runs in debug mode.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['assets'] = ManifestState(app.config['ASSETS_DIST_DIR'])
+        app.add_template_global(self.url, 'asset_url')
+
+    @property
+    def manifest(self):
+        return current_app.extensions['assets'].manifest(reload=current_app.debug)
+
+    def url(self, name):
+        manifest = self.manifest
+        if name in manifest:
+            return url_for('assets.asset', filename=manifest[name])
+        return ASSET_SOURCES[name][1]
+
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a built asset, precompressed when the client accepts it.
+
+    Names carry a content hash, so responses can be cached for good.
+    """
+    dist_dir = current_app.config['ASSETS_DIST_DIR']
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, suffix in PRECOMPRESSED:
+        path = safe_join(dist_dir, filename + suffix)
+        if request.accept_encodings[candidate] and path and os.path.isfile(path):
+            encoding, filename = candidate, filename + suffix
+            break
+    response = send_from_directory(dist_dir, filename, mimetype=mimetype,
+                                   max_age=current_app.config['ASSETS_MAX_AGE'])
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,76 @@
+from flask import Blueprint, render_template, flash, redirect, url_for, request, abort
+from flask_login import current_user, login_user, logout_user
+from werkzeug.urls import url_parse
+from sqlalchemy.exc import IntegrityError
+from functools import wraps
+
+from app import db, password_hasher
+from app.forms import LoginForm, RegistrationForm
+from app.models import User
+from app.choices import user_choices
+
+bp = Blueprint('auth', __name__)
+
+
+def requires_role(required_role: str = 'Admin'):
+    """Abort with 401 unless the current user has `required_role`; admins pass every check."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped_view(*args, **kwargs):
+            if not current_user.has_role(required_role):
+                abort(401)
+            return view(*args, **kwargs)
+        return wrapped_view
+    return decorator
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('rota.index'))
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(username=form.username.data).first()
+        if user is None:
+            # Hash anyway, so an unknown username takes as long as a wrong password.
+            password_hasher.verify(None, form.password.data)
+        if user is None or not user.check_password(form.password.data):
+            flash('Invalid username or password')
+            return redirect(url_for('auth.login'))
+        if user.password_needs_rehash():
+            user.set_password(form.password.data)
+            db.session.commit()
+        login_user(user, remember=form.remember_me.data)
+        next_page = request.args.get('next')
+        if not next_page or url_parse(next_page).netloc != '':
+            next_page = url_for('rota.index')
+        return redirect(next_page)
+    return render_template('login.html', title='Sign In', form=form)
+
+
+@bp.route('/logout')
+def logout():
+    logout_user()
+    return redirect(url_for('rota.index'))
+
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('rota.index'))
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        user = User(username=form.username.data, email=form.email.data)
+        user.set_password(form.password.data)
+        db.session.add(user)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Someone registered the same username or email since validation ran.
+            db.session.rollback()
+            form.check_unique()
+            return render_template('register.html', title='Register', form=form)
+        user_choices.invalidate()
+        flash('Congratulations, you are now a registered user!')
+        return redirect(url_for('auth.login'))
+    return render_template('register.html', title='Register', form=form)
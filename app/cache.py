@@ -0,0 +1,147 @@
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBackend(object):
+    """Process-local LRU store with per-key expiry."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend(object):
+    """Shared store on anything that speaks the Redis protocol.
+
+    Needs the optional `redis` package. Errors talking to the server are
+    logged and treated as cache misses so an outage only costs the queries
+    the cache would have saved.
+    """
+
+    def __init__(self, url, prefix=''):
+        import redis
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self._client.get(self.prefix + key)
+        except self._errors:
+            logger.warning('cache get failed for %s', key, exc_info=True)
+            return None
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        try:
+            self._client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+        except self._errors:
+            logger.warning('cache set failed for %s', key, exc_info=True)
+
+    def delete(self, key):
+        try:
+            self._client.delete(self.prefix + key)
+        except self._errors:
+            logger.warning('cache delete failed for %s', key, exc_info=True)
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter(match=self.prefix + '*'))
+            if keys:
+                self._client.delete(*keys)
+        except self._errors:
+            logger.warning('cache clear failed', exc_info=True)
+
+
+class CacheState(object):
+    """One app's cache backend and default expiry, kept in app.extensions['cache']."""
+
+    def __init__(self, backend, default_ttl):
+        self.backend = backend
+        self.default_ttl = default_ttl
+
+
+class Cache(object):
+    """Small cache extension.
+
+    Uses a process-local LRU unless CACHE_REDIS_URL is configured, in which
+    case entries are shared between workers. `None` is never cached. Each
+    app gets its own backend, found through current_app.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('CACHE_REDIS_URL')
+        if url:
+            backend = RedisBackend(url, prefix=app.config.get('CACHE_KEY_PREFIX', ''))
+        else:
+            backend = LocalBackend(maxsize=app.config.get('CACHE_MAX_ENTRIES', 1024))
+        app.extensions['cache'] = CacheState(backend, app.config.get('CACHE_DEFAULT_TTL', 300))
+
+    @property
+    def _state(self):
+        return current_app.extensions['cache']
+
+    @property
+    def backend(self):
+        return self._state.backend
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        if value is not None:
+            state = self._state
+            state.backend.set(key, value, state.default_ttl if ttl is None else ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_or_set(self, key, factory, ttl=None):
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
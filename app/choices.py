@@ -0,0 +1,90 @@
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from app import db, cache
+from app.models import Business, Employee, Role, User
+
+# Also a (value, label) pair, so a list of these is usable as WTForms choices.
+Choice = namedtuple('Choice', ['id', 'name'])
+
+TYPEAHEAD_LIMIT = 20
+
+
+class ChoiceProvider(object):
+    """An (id, name) list for a select field, cached until `invalidate` is called.
+
+    Views that add or rename rows call `invalidate`; CHOICES_CACHE_TTL bounds
+    how stale a list can get when a write happens in another process.
+    """
+
+    def __init__(self, name, columns, order_by):
+        self.cache_key = f'choices:{name}'
+        self.columns = columns
+        self.order_by = order_by
+
+    def choices(self):
+        return cache.get_or_set(
+            self.cache_key,
+            lambda: [Choice(*row) for row in db.session.query(*self.columns).order_by(*self.order_by)],
+            ttl=current_app.config['CHOICES_CACHE_TTL'])
+
+    def name(self, id):
+        return next((choice.name for choice in self.choices() if choice.id == id), None)
+
+    def invalidate(self):
+        cache.delete(self.cache_key)
+
+
+employee_choices = ChoiceProvider('employees', (Employee.id, Employee.fullname),
+                                  (Employee.firstname, Employee.lastname))
+business_choices = ChoiceProvider('businesses', (Business.id, Business.name), (Business.name,))
+user_choices = ChoiceProvider('users', (User.id, User.username), (User.username,))
+role_choices = ChoiceProvider('roles', (Role.id, Role.name), (Role.name,))
+
+
+def prefix_clause(column, prefix):
+    """`column` starts with `prefix`, as a range both SQLite and PostgreSQL serve from a btree index.
+
+    LIKE 'x%' only uses an index under particular collations or operator
+    classes; a >= / < range always can. The range is case sensitive.
+    """
+    return and_(column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+def _case_variants(text):
+    # Names are stored capitalised, so "smi" should also find "Smith".
+    return {text, text[:1].upper() + text[1:]}
+
+
+def _employee_clause(text):
+    words = text.split()
+    if len(words) > 1:
+        first, last = words[0], ' '.join(words[1:])
+        return or_(*[and_(Employee.firstname == f, prefix_clause(Employee.lastname, l))
+                     for f in _case_variants(first) for l in _case_variants(last)])
+    return or_(*[prefix_clause(column, t) for column in (Employee.firstname, Employee.lastname)
+                 for t in _case_variants(text)])
+
+
+def _column_clause(column):
+    return lambda text: or_(*[prefix_clause(column, t) for t in _case_variants(text)])
+
+
+# kind -> (provider, filter for the search text)
+TYPEAHEAD_SOURCES = {
+    'employees': (employee_choices, _employee_clause),
+    'businesses': (business_choices, _column_clause(Business.name)),
+    'users': (user_choices, _column_clause(User.username)),
+}
+
+
+def typeahead(kind, text, limit=TYPEAHEAD_LIMIT):
+    """Up to `limit` Choices of `kind` whose name (or employee first/last name) starts with `text`."""
+    provider, clause = TYPEAHEAD_SOURCES[kind]
+    text = text.strip()
+    query = db.session.query(*provider.columns)
+    if text:
+        query = query.filter(clause(text))
+    return [Choice(*row) for row in query.order_by(*provider.order_by).limit(limit)]
@@ -0,0 +1,141 @@
+import time
+from datetime import date
+
+import click
+from flask import current_app
+from sqlalchemy import func
+from flask.cli import AppGroup, with_appcontext
+
+from app import db, password_hasher
+from app.importer import IMPORT_CHUNK_SIZE, format_for_filename, import_shifts, read_records
+from app.summary import refresh_summary
+from app.explain import check_query_plans
+from app.security import calibrate_iterations, time_pbkdf2
+from app.jobs import run_worker
+from app.assets import MissingAssets, build_assets
+from app.archive import archive_shifts
+from app.models import Shift
+from app.partitions import add_months, drop_empty_partitions, ensure_partitions, month_range, month_start, \
+    shift_is_partitioned
+
+shifts_cli = AppGroup('shifts', help='Shift maintenance commands.')
+auth_cli = AppGroup('auth', help='Authentication commands.')
+assets_cli = AppGroup('assets', help='Static asset commands.')
+
+
+@shifts_cli.command('import')
+@click.argument('file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'json']),
+              help='Input format; guessed from the file extension by default.')
+@click.option('--chunk-size', default=IMPORT_CHUNK_SIZE, show_default=True,
+              help='Rows inserted per transaction.')
+def import_command(file, fmt, chunk_size):
+    """Bulk import shifts from a CSV or JSON file ('-' for stdin)."""
+    result = import_shifts(read_records(file, fmt or format_for_filename(file.name)), chunk_size=chunk_size)
+    for row, message in result.errors:
+        click.echo(f'row {row}: {message}', err=True)
+    click.echo(result.summary())
+
+
+@shifts_cli.command('rebuild-summary')
+def rebuild_summary_command():
+    """Recompute the labour cost summary table from every shift."""
+    started = time.perf_counter()
+    refresh_summary()
+    db.session.commit()
+    click.echo(f'Labour cost summary rebuilt in {time.perf_counter() - started:.2f}s.')
+
+
+@shifts_cli.command('check-indexes')
+@click.option('--verbose', '-v', is_flag=True, help='Print every query plan, not just failures.')
+def check_indexes_command(verbose):
+    """EXPLAIN the hot shift/wage queries and fail unless each uses its index."""
+    failed = 0
+    for name, ok, plan in check_query_plans():
+        click.echo(f'{"ok  " if ok else "FAIL"} {name}')
+        if verbose or not ok:
+            click.echo('    ' + plan.replace('\n', '\n    '))
+        failed += not ok
+    if failed:
+        raise click.ClickException(f'{failed} queries do not use their index.')
+
+
+@shifts_cli.command('archive')
+@click.option('--before', required=True, type=click.DateTime(['%Y-%m-%d']),
+              help='First day of the oldest month to keep in the shift table.')
+def archive_command(before):
+    """Move shifts of closed months into shift_archive, one month per transaction."""
+    before = before.date()
+    if before.day != 1 or before > month_start(date.today()):
+        raise click.BadParameter('must be the first day of a month no later than this one.', param_hint='--before')
+    oldest = db.session.query(func.min(Shift.start_time)).scalar()
+    moved = 0
+    if oldest is not None and oldest.date() < before:
+        for month in month_range(oldest, add_months(before, -1)):
+            count = archive_shifts(add_months(month, 1))
+            db.session.commit()
+            if count:
+                click.echo(f'{month:%Y-%m}: archived {count} shifts.')
+            moved += count
+    if shift_is_partitioned():
+        for name in drop_empty_partitions(before):
+            click.echo(f'Dropped empty partition {name}.')
+        db.session.commit()
+    click.echo(f'Archived {moved} shifts starting before {before}.')
+
+
+@shifts_cli.command('partitions')
+@click.option('--months-ahead', default=3, show_default=True, help='Months past this one to create partitions for.')
+def partitions_command(months_ahead):
+    """Create monthly partitions of the shift table on PostgreSQL."""
+    if not shift_is_partitioned():
+        click.echo('The shift table is not partitioned (PostgreSQL only); nothing to do.')
+        return
+    created = ensure_partitions(add_months(month_start(date.today()), months_ahead))
+    for name in created:
+        click.echo(f'Created partition {name}.')
+    click.echo(f'{len(created)} partitions created.')
+
+
+@auth_cli.command('calibrate')
+@click.option('--target-ms', default=250.0, show_default=True, help='Wanted time for one password hash.')
+def calibrate_command(target_ms):
+    """Time password hashing on this host and suggest PASSWORD_HASH_ITERATIONS."""
+    algorithm = password_hasher.algorithm
+    click.echo(f'Current policy {password_hasher.method}: '
+               f'{time_pbkdf2(algorithm, password_hasher.iterations):.1f}ms per hash.')
+    iterations = calibrate_iterations(algorithm, target_ms)
+    click.echo(f'{iterations} iterations take {time_pbkdf2(algorithm, iterations):.1f}ms '
+               f'(target {target_ms:g}ms).')
+    click.echo(f'Set PASSWORD_HASH_ITERATIONS={iterations} to use it.')
+
+
+@assets_cli.command('build')
+@click.option('--offline', is_flag=True, help="Don't download assets missing from the vendor directory.")
+@click.option('--clean', is_flag=True, help='Remove earlier builds first.')
+@click.option('--allow-cdn', is_flag=True, help="Build anyway when assets can't be vendored; pages load those "
+                                                "from their CDN.")
+def build_assets_command(offline, clean, allow_cdn):
+    """Fingerprint and precompress vendored assets into ASSETS_DIST_DIR."""
+    config = current_app.config
+    try:
+        manifest, missing = build_assets(config['ASSETS_DIST_DIR'], config['ASSETS_VENDOR_DIR'],
+                                         download=not offline, clean=clean, allow_missing=allow_cdn)
+    except MissingAssets as e:
+        raise click.ClickException(
+            f'{", ".join(e.names)} could not be vendored into {config["ASSETS_VENDOR_DIR"]}. Run the build once '
+            f'with network access and commit that directory, or pass --allow-cdn to load them from their CDN.')
+    click.echo(f'Built {len(manifest)} assets into {config["ASSETS_DIST_DIR"]}.')
+    for name in missing:
+        click.echo(f'{name} is not vendored; pages load it from its CDN.', err=True)
+
+
+@click.command('worker')
+@click.option('--processes', '-p', type=int, help='Jobs run at once (default JOB_WORKER_PROCESSES); '
+                                                  '0 runs them in this process.')
+@click.option('--burst', is_flag=True, help='Exit once no job is waiting instead of polling.')
+@with_appcontext
+def worker_command(processes, burst):
+    """Run queued background jobs (imports, exports, cost recalculation)."""
+    ran = run_worker(processes=processes, burst=burst)
+    click.echo(f'Ran {ran} jobs.')
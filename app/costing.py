@@ -0,0 +1,109 @@
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+
+from sqlalchemy import Float, and_, func, or_, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+# Rate applied when an employee has no wage covering the shift.
+DEFAULT_HOURLY_RATE = 10.42
+
+
+class hours_between(FunctionElement):
+    """SQL expression for the number of hours between two DateTime columns."""
+    type = Float()
+    name = 'hours_between'
+    inherit_cache = True
+
+
+@compiles(hours_between)
+def _hours_between_default(element, compiler, **kw):
+    start, finish = list(element.clauses)
+    return 'EXTRACT(EPOCH FROM (%s - %s)) / 3600.0' % (compiler.process(finish, **kw),
+                                                       compiler.process(start, **kw))
+
+
+@compiles(hours_between, 'sqlite')
+def _hours_between_sqlite(element, compiler, **kw):
+    start, finish = list(element.clauses)
+    # Whole seconds, as julianday() differences are off by a few microseconds.
+    return "((strftime('%%s', %s) - strftime('%%s', %s)) / 3600.0)" % (compiler.process(finish, **kw),
+                                                                      compiler.process(start, **kw))
+
+
+@compiles(hours_between, 'mysql')
+def _hours_between_mysql(element, compiler, **kw):
+    start, finish = list(element.clauses)
+    return '(TIMESTAMPDIFF(SECOND, %s, %s) / 3600.0)' % (compiler.process(start, **kw),
+                                                         compiler.process(finish, **kw))
+
+
+def shift_hours(start_time, finish_time):
+    return (finish_time - start_time).total_seconds() / 3600
+
+
+def wage_applies(wage, start_time, finish_time):
+    """A wage covers a shift if it started before the shift and is either
+    current or runs past the end of the shift."""
+    if wage.valid_from >= start_time:
+        return False
+    return wage.is_current or (wage.valid_to is not None and wage.valid_to > finish_time)
+
+
+WageSpan = namedtuple('WageSpan', ['valid_from', 'valid_to', 'is_current', 'hourly_rate'])
+
+
+class WageIndex(object):
+    """Every employee's wages sorted by start, for resolving rates by binary search.
+
+    Built from plain (employee_id, valid_from, valid_to, is_current,
+    hourly_rate) rows so it holds no ORM state and can outlive a session.
+    """
+
+    def __init__(self, rows):
+        spans = defaultdict(list)
+        for employee_id, valid_from, valid_to, is_current, hourly_rate in rows:
+            spans[employee_id].append(WageSpan(valid_from, valid_to, is_current, hourly_rate))
+        self._spans = {}
+        self._starts = {}
+        for employee_id, employee_spans in spans.items():
+            employee_spans.sort(key=lambda w: w.valid_from)
+            self._spans[employee_id] = employee_spans
+            self._starts[employee_id] = [w.valid_from for w in employee_spans]
+
+    def rate(self, employee_id, start_time, finish_time):
+        """Rate of the latest-starting wage covering the shift, as in `hourly_rate_expression`.
+
+        Bisecting finds the latest wage starting before the shift; walking back
+        from there stops at the first one that still covers it, which is
+        normally that first candidate.
+        """
+        starts = self._starts.get(employee_id)
+        if not starts:
+            return DEFAULT_HOURLY_RATE
+        spans = self._spans[employee_id]
+        for i in range(bisect_left(starts, start_time) - 1, -1, -1):
+            if wage_applies(spans[i], start_time, finish_time):
+                return spans[i].hourly_rate
+        return DEFAULT_HOURLY_RATE
+
+    def cost(self, employee_id, start_time, finish_time):
+        return shift_hours(start_time, finish_time) * self.rate(employee_id, start_time, finish_time)
+
+
+def wage_covers_clause(wage, shift):
+    """SQL counterpart of `wage_applies`, joining `wage` rows onto `shift` rows."""
+    return and_(wage.employee_id == shift.employee_id,
+                wage.valid_from < shift.start_time,
+                or_(wage.is_current, wage.valid_to > shift.finish_time))
+
+
+def hourly_rate_expression(wage, shift):
+    """Correlated scalar subquery picking the rate that applies to each shift."""
+    rate = (select(wage.hourly_rate)
+            .where(wage_covers_clause(wage, shift))
+            .order_by(wage.valid_from.desc())
+            .limit(1)
+            .correlate_except(wage)
+            .scalar_subquery())
+    return func.coalesce(rate, DEFAULT_HOURLY_RATE)
@@ -0,0 +1,92 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app import db
+from app.models import LabourCostSummary, Shift, Wage
+from app.overlaps import overlap_clause
+from app.archive import all_shifts
+
+# How PostgreSQL names each partition's copy of an index on the partitioned shift table.
+PARTITION_INDEX = r'shift_(default|y\d{4}m\d{2})_%s_idx'
+
+
+class explain(Executable, ClauseElement):
+    """EXPLAIN for any SELECT, rendered in the syntax of the current dialect."""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(explain)
+def _explain_default(element, compiler, **kw):
+    return 'EXPLAIN ' + compiler.process(element.statement, **kw)
+
+
+@compiles(explain, 'sqlite')
+def _explain_sqlite(element, compiler, **kw):
+    return 'EXPLAIN QUERY PLAN ' + compiler.process(element.statement, **kw)
+
+
+def hot_queries():
+    """(name, statement, index name patterns any one of which the plan should use) for the hot paths."""
+    moment = datetime(2022, 1, 1)
+    archived = all_shifts()
+    return [
+        ('shifts for employee',
+         select(Shift).where(Shift.employee_id == 1).order_by(Shift.start_time),
+         {'ix_shift_employee_id_start_time', PARTITION_INDEX % 'employee_id_start_time'}),
+        ('shifts for business',
+         select(Shift).where(Shift.business_id == 1).order_by(Shift.start_time),
+         {'ix_shift_business_id_start_time', PARTITION_INDEX % 'business_id_start_time'}),
+        ('shifts in date range',
+         select(Shift).where(Shift.start_time >= moment, Shift.start_time < datetime(2022, 2, 1)),
+         {'ix_shift_start_time', PARTITION_INDEX % 'start_time'}),
+        ('overlapping shifts for employee',
+         select(Shift).where(overlap_clause(1, moment, datetime(2022, 1, 1, 8))),
+         {'ix_shift_employee_id_start_time', PARTITION_INDEX % 'employee_id_start_time'}),
+        ('archived shifts for employee',
+         select(archived).where(archived.employee_id == 1),
+         {'ix_shift_archive_employee_id_start_time'}),
+        ('current wage',
+         select(Wage).where(Wage.employee_id == 1, Wage.is_current == True),
+         {'uq_wage_current_employee_id', 'ix_wage_employee_id_validity'}),
+        ('wage covering shift',
+         select(Wage.hourly_rate)
+         .where(Wage.employee_id == 1, Wage.valid_from < moment,
+                or_(Wage.is_current, Wage.valid_to > moment))
+         .order_by(Wage.valid_from.desc()).limit(1),
+         {'ix_wage_employee_id_validity'}),
+        ('labour costs for period',
+         select(LabourCostSummary).where(LabourCostSummary.day >= moment.date()),
+         {'ix_labour_cost_summary_day'}),
+    ]
+
+
+def query_plan(statement):
+    rows = db.session.execute(explain(statement)).all()
+    return '\n'.join(' '.join(str(col) for col in row) for row in rows)
+
+
+def check_query_plans():
+    """Run EXPLAIN on each hot query and report whether it uses one of its indexes.
+
+    Returns (name, ok, plan) tuples. Tiny or empty tables make PostgreSQL
+    prefer sequential scans, so those are disabled for the check (inside a
+    transaction that is rolled back); the point is that a matching index
+    exists and is usable, not the planner's cost choice.
+    """
+    results = []
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(db.text('SET LOCAL enable_seqscan = off'))
+        for name, statement, indexes in hot_queries():
+            plan = query_plan(statement)
+            results.append((name, any(re.search(index, plan) for index in indexes), plan))
+    finally:
+        db.session.rollback()
+    return results
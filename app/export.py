@@ -0,0 +1,59 @@
+import csv
+import io
+from itertools import islice
+
+from app.models import wage_index
+
+EXPORT_BATCH_SIZE = 1000
+# Flush the CSV buffer to the client once it holds this many characters.
+EXPORT_FLUSH_SIZE = 16 * 1024
+SHIFT_EXPORT_HEADER = ('shift_id', 'business', 'employee', 'start_time', 'finish_time', 'length_hours', 'cost')
+
+
+def iter_shifts_csv(query, excel=False):
+    """Yield a CSV export of `shift_export_query` rows in chunks.
+
+    Rows are fetched EXPORT_BATCH_SIZE at a time (a server-side cursor where
+    the driver supports one), so memory use doesn't depend on the export size.
+    Costs come from the wage index, fetched once so the whole export is
+    priced against the same wages.
+    `excel` prefixes a byte order mark so Excel detects UTF-8.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if excel:
+        buffer.write('\ufeff')
+    writer.writerow(SHIFT_EXPORT_HEADER)
+    # send the header straight away so the download starts before the first batch
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    index = wage_index()
+    for id, business, employee, start_time, finish_time, length, employee_id in query.yield_per(EXPORT_BATCH_SIZE):
+        cost = index.cost(employee_id, start_time, finish_time)
+        writer.writerow((id, business, employee, start_time.isoformat(sep=' '), finish_time.isoformat(sep=' '),
+                         f'{length:.2f}', f'{cost:.2f}'))
+        if buffer.tell() >= EXPORT_FLUSH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_batches(query, size=EXPORT_BATCH_SIZE):
+    """`query`'s rows in lists of up to `size`, read through a server-side cursor like the CSV export."""
+    rows = iter(query.yield_per(size))
+    return iter(lambda: list(islice(rows, size)), [])
+
+
+def coalesce_chunks(chunks, size=EXPORT_FLUSH_SIZE):
+    """Join small chunks, like a streamed template's output, into ones of about `size` characters."""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    yield ''.join(buffer)
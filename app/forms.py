@@ -1,9 +1,74 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, DecimalField, DateTimeField, SelectField
 from wtforms.validators import ValidationError, DataRequired, Email, EqualTo, InputRequired, Optional
 from wtforms.fields import DateTimeLocalField
-from app.models import User, Employee, Business, Shift, Role, UserRoles
-
+from flask import current_app, url_for
+from sqlalchemy import and_, exists
+from app import db
+from app.models import User, Employee, Business, Shift, Role, UserRoles, Wage
+from app.choices import employee_choices, business_choices, user_choices, role_choices
+from app.overlaps import MAX_SHIFT_HOURS, MAX_SHIFT_LENGTH, overlapping_shifts
+
+
+class CachedSelectField(SelectField):
+    """Select whose options come from a cached ChoiceProvider.
+
+    Submitted ids are checked with one EXISTS query against `model` rather
+    than against the option list, so a POST never loads the choices. Lists
+    longer than CHOICES_INLINE_LIMIT render only the selected option, and the
+    typeahead script in base.html fills in matches from /api/choices/<typeahead>.
+    """
+
+    def __init__(self, label=None, validators=None, provider=None, model=None, typeahead=None, **kwargs):
+        super().__init__(label, validators, coerce=int, **kwargs)
+        self.provider = provider
+        self.model = model
+        self.typeahead = typeahead
+
+    def iter_choices(self):
+        if self.choices is None:
+            choices = self.provider.choices()
+            if self.typeahead and len(choices) > current_app.config['CHOICES_INLINE_LIMIT']:
+                choices = [c for c in choices if c.id == self.data]
+            self.choices = choices
+        return super().iter_choices()
+
+    def __call__(self, **kwargs):
+        if self.typeahead:
+            kwargs.setdefault('data_typeahead_url', url_for('rota.api_choices', kind=self.typeahead))
+        return super().__call__(**kwargs)
+
+    def pre_validate(self, form):
+        if self.data is None or not db.session.query(exists().where(self.model.id == self.data)).scalar():
+            raise ValidationError(self.gettext('Not a valid choice.'))
+
+
+class UniqueFieldsMixin(object):
+    """Form-level uniqueness checks answered by a single query.
+
+    `unique_checks` returns (clause, fields, message) triples; one SELECT of
+    EXISTS(clause) per triple runs after the field validators pass, and each
+    clause that matches adds `message` to its fields. The database unique
+    constraints stay the final word: when a commit races another insert and
+    raises IntegrityError, the view rolls back and calls `check_unique` again
+    to turn it into the same field errors.
+    """
+
+    def unique_checks(self):
+        return []
+
+    def check_unique(self):
+        checks = self.unique_checks()
+        found = db.session.query(*[exists().where(clause) for clause, _, _ in checks]).one()
+        for taken, (_, fields, message) in zip(found, checks):
+            if taken:
+                for field in fields:
+                    field.errors.append(message)
+        return not any(found)
+
+    def validate(self, extra_validators=None):
+        return super().validate(extra_validators) and self.check_unique()
 
 
 class LoginForm(FlaskForm):
@@ -13,7 +78,7 @@ class LoginForm(FlaskForm):
     submit = SubmitField('Sign In')
 
 
-class RegistrationForm(FlaskForm):
+class RegistrationForm(UniqueFieldsMixin, FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
     email = StringField('Email', validators=[DataRequired(), Email()])
     password = PasswordField('Password', validators=[DataRequired()])
@@ -21,32 +86,20 @@ class RegistrationForm(FlaskForm):
         'Repeat Password', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Register')
 
-    def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user is not None:
-            raise ValidationError('Please use a different username.')
-
-    def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user is not None:
-            raise ValidationError('Please use a different email address.')
+    def unique_checks(self):
+        return [(User.username == self.username.data, [self.username], 'Please use a different username.'),
+                (User.email == self.email.data, [self.email], 'Please use a different email address.')]
 
 
-class NewEmployeeForm(FlaskForm):
+class NewEmployeeForm(UniqueFieldsMixin, FlaskForm):
     firstname = StringField('First name', validators=[DataRequired()])
     lastname = StringField('Last name', validators=[DataRequired()])
     hourly_rate = DecimalField('Hourly rate', places=2, validators=[DataRequired()])
     submit = SubmitField('Add employee')
 
-    def validate_firstname(self, firstname):
-        employee = Employee.query.filter_by(firstname=firstname.data, lastname=self.lastname.data).first()
-        if employee is not None:
-            raise ValidationError('Employee with same first and last name already exists.')
-
-    def validate_lastname(self, lastname):
-        employee = Employee.query.filter_by(firstname=self.firstname.data, lastname=lastname.data).first()
-        if employee is not None:
-            raise ValidationError('Employee with same first and last name already exists.')
+    def unique_checks(self):
+        return [(and_(Employee.firstname == self.firstname.data, Employee.lastname == self.lastname.data),
+                 [self.firstname, self.lastname], 'Employee with same first and last name already exists.')]
 
     def validate_hourly_rate(self, hourly_rate):
         str_rate = str(hourly_rate.data)
@@ -62,20 +115,20 @@ class NewEmployeeForm(FlaskForm):
                 raise ValidationError('Triple figure hourly rate is too high!')
 
 
-class NewBusinessForm(FlaskForm):
+class NewBusinessForm(UniqueFieldsMixin, FlaskForm):
     name = StringField('Business name', validators=[DataRequired()])
     submit = SubmitField('Add business')
 
-    def validate_name(self, name):
-        business = Business.query.filter_by(name=name.data).first()
-        if business is not None:
-            raise ValidationError('Business with same name already exists.')
+    def unique_checks(self):
+        return [(Business.name == self.name.data, [self.name], 'Business with same name already exists.')]
 
 
 class NewShiftForm(FlaskForm):
 
-    employee_id = SelectField(u'Employee', validators=[DataRequired()], id='employee')
-    business_id = SelectField(u'Business', validators=[DataRequired()], id='business')
+    employee_id = CachedSelectField(u'Employee', validators=[DataRequired()], id='employee',
+                                    provider=employee_choices, model=Employee, typeahead='employees')
+    business_id = CachedSelectField(u'Business', validators=[DataRequired()], id='business',
+                                    provider=business_choices, model=Business, typeahead='businesses')
     start_time = DateTimeLocalField('Shift start', format='%Y-%m-%dT%H:%M', validators=[InputRequired()])
     finish_time = DateTimeLocalField('Shift finish', format='%Y-%m-%dT%H:%M', validators=[InputRequired()])
     submit = SubmitField('Add shift')
@@ -87,10 +140,25 @@ class NewShiftForm(FlaskForm):
     def validate_finish_time(self, finish_time):
         if finish_time.data < self.start_time.data:
             raise ValidationError('Finish time can not be before start time.')
+        if finish_time.data - self.start_time.data > MAX_SHIFT_LENGTH:
+            raise ValidationError(f'Shifts can be at most {MAX_SHIFT_HOURS} hours long.')
+        clash = self.booking_clash()
+        if clash is not None:
+            raise ValidationError(clash)
+
+    def booking_clash(self):
+        """Message naming a shift of the employee that overlaps the form's times, or None."""
+        try:
+            employee_id = int(self.employee_id.data)
+        except (TypeError, ValueError):
+            return None
+        clash = overlapping_shifts(employee_id, self.start_time.data, self.finish_time.data).first()
+        if clash is None:
+            return None
+        return f'Employee is already booked from {clash.start_time:%d %b %H:%M} to {clash.finish_time:%d %b %H:%M}.'
 
     def validate_employee_id(self, employee_id):
-        e = Employee.query.filter_by(id=employee_id.data).first()
-        if e.wages is None:
+        if not db.session.query(exists().where(Wage.employee_id == employee_id.data)).scalar():
             raise ValidationError(f'Employee does not have wages, add wages at http://127.0.0.1:5000/new_wage/{employee_id.data}')
 
 
@@ -106,13 +174,18 @@ class NewWageForm(FlaskForm):
 
 
 class NewUserRoleForm(FlaskForm):
-    user_id = SelectField(u'User', validators=[DataRequired()], id='user')
-    role_id = SelectField(u'Role', validators=[DataRequired()], id='role')
+    user_id = CachedSelectField(u'User', validators=[DataRequired()], id='user',
+                                provider=user_choices, model=User, typeahead='users')
+    role_id = CachedSelectField(u'Role', validators=[DataRequired()], id='role', provider=role_choices, model=Role)
 
     submit = SubmitField('Add user role')
     def validate_role_id(self, role_id):
-        u = User.query.filter_by(id=self.user_id.data).first()
-        u_roles = [r.id for r in u.roles]
+        if db.session.query(exists().where(UserRoles.user_id == self.user_id.data,
+                                           UserRoles.role_id == role_id.data)).scalar():
+            raise ValidationError(f"User already has {role_choices.name(role_id.data)} role")
+
 
-        if role_id in u_roles:
-            raise ValidationError(f"User already has {Role.query.filter_by(id=role_id)} role")
+class ImportShiftsForm(FlaskForm):
+    file = FileField('Shifts file (CSV or JSON)', validators=[
+        FileRequired(), FileAllowed(['csv', 'json', 'jsonl', 'ndjson'], 'CSV or JSON files only.')])
+    submit = SubmitField('Import shifts')
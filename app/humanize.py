@@ -0,0 +1,45 @@
+from bisect import bisect_right
+from datetime import datetime
+
+# moment.js's fromNow thresholds: below `limit` seconds the distance reads
+# `label`, or a rounded count of `unit` seconds called `units`.
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RELATIVE_THRESHOLDS = [
+    # (limit, label, unit, units)
+    (45, 'a few seconds', None, None),
+    (90, 'a minute', None, None),
+    (45 * MINUTE, None, MINUTE, 'minutes'),
+    (90 * MINUTE, 'an hour', None, None),
+    (22 * HOUR, None, HOUR, 'hours'),
+    (36 * HOUR, 'a day', None, None),
+    (26 * DAY, None, DAY, 'days'),
+    (45 * DAY, 'a month', None, None),
+    (320 * DAY, None, 30.436875 * DAY, 'months'),
+    (548 * DAY, 'a year', None, None),
+    (float('inf'), None, 365.2425 * DAY, 'years'),
+]
+_LIMITS = [limit for limit, _, _, _ in RELATIVE_THRESHOLDS]
+
+
+def relative_times(times, now=None):
+    """'in 3 days' / '2 hours ago' for each datetime in `times`, as moment's fromNow words it.
+
+    Works on a whole batch at once: each distance is bucketed with one
+    bisect and each distinct phrase is built once, so a table of shifts
+    costs a few string lookups per row instead of a moment() call per row
+    in the browser.
+    """
+    now = now or datetime.now()
+    phrases = {}
+    labels = []
+    for seconds in [(time - now).total_seconds() for time in times]:
+        bucket = bisect_right(_LIMITS, abs(seconds))
+        _, label, unit, units = RELATIVE_THRESHOLDS[bucket]
+        count = round(abs(seconds) / unit) if unit else 0
+        key = (bucket, count, seconds > 0)
+        phrase = phrases.get(key)
+        if phrase is None:
+            text = label or f'{count} {units}'
+            phrase = phrases[key] = f'in {text}' if seconds > 0 else f'{text} ago'
+        labels.append(phrase)
+    return labels
@@ -0,0 +1,163 @@
+import csv
+import json
+import time
+from datetime import datetime
+
+from app import db
+from app.models import Business, Employee, Shift
+from app.overlaps import MAX_SHIFT_HOURS, MAX_SHIFT_LENGTH, existing_intervals, find_overlaps
+from app.summary import refresh_summary
+from app.versions import bump, shift_scopes
+
+SHIFT_IMPORT_FIELDS = ('employee_id', 'business_id', 'start_time', 'finish_time')
+IMPORT_CHUNK_SIZE = 1000
+# Only the first few rejected rows are kept for the report; all are counted.
+MAX_REPORTED_ERRORS = 50
+
+
+class ImportResult(object):
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+    def reject(self, row, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+
+    def summary(self):
+        return (f'Imported {self.imported} shifts, rejected {self.rejected} '
+                f'in {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s).')
+
+
+def format_for_filename(filename):
+    return 'json' if filename.lower().endswith(('.json', '.jsonl', '.ndjson')) else 'csv'
+
+
+def read_records(stream, fmt):
+    """Yield one dict per shift from a text stream without reading it all first.
+
+    CSV needs a header row naming SHIFT_IMPORT_FIELDS. JSON may be one object
+    per line, or a single array (which has to be parsed in one go). Lines
+    that are not valid JSON are passed through as strings and rejected later.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+
+    first = stream.read(1)
+    while first.isspace():
+        first = stream.read(1)
+    if first == '[':
+        yield from json.loads(first + stream.read())
+        return
+    pending = first
+    for line in stream:
+        line = (pending + line).strip()
+        pending = ''
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield line
+
+
+def parse_datetime(value):
+    """A naive datetime from an ISO string; shift times are local wall-clock times, like the shift form's.
+
+    Values with a UTC offset (`+01:00`, `Z`) are rejected rather than
+    converted, since which local time they were meant as isn't known.
+    """
+    if not isinstance(value, datetime):
+        value = str(value).strip()
+        if value.endswith(('Z', 'z')):
+            value = value[:-1] + '+00:00'
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        raise ValueError(f'{value.isoformat(sep=" ")} has a UTC offset; give local times without one')
+    return value
+
+
+def parse_shift_record(record, employee_ids, business_ids):
+    """Turn one input record into a Shift insert mapping, or raise ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError('malformed record')
+    missing = [f for f in SHIFT_IMPORT_FIELDS if record.get(f) in (None, '')]
+    if missing:
+        raise ValueError(f'missing {", ".join(missing)}')
+    employee_id = int(record['employee_id'])
+    business_id = int(record['business_id'])
+    if employee_id not in employee_ids:
+        raise ValueError(f'unknown employee {employee_id}')
+    if business_id not in business_ids:
+        raise ValueError(f'unknown business {business_id}')
+    start_time = parse_datetime(record['start_time'])
+    finish_time = parse_datetime(record['finish_time'])
+    if finish_time <= start_time:
+        raise ValueError('start time must be before finish time')
+    if finish_time - start_time > MAX_SHIFT_LENGTH:
+        raise ValueError(f'shift is longer than {MAX_SHIFT_HOURS} hours')
+    return {'employee_id': employee_id, 'business_id': business_id,
+            'start_time': start_time, 'finish_time': finish_time}
+
+
+def import_shifts(records, chunk_size=IMPORT_CHUNK_SIZE, on_chunk=None):
+    """Validate and insert shift records, committing every `chunk_size` rows.
+
+    Employee and business ids are checked against sets loaded up front, so
+    validation costs no queries per row. Each chunk is checked for double
+    bookings in one sort-and-sweep pass against the employees' shifts over
+    its time span (one query), so earlier chunks count too. Invalid and
+    overlapping rows are skipped and reported. `on_chunk(result)` is called
+    after each committed chunk, e.g. to report progress.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    employee_ids = {id for (id,) in db.session.query(Employee.id)}
+    business_ids = {id for (id,) in db.session.query(Business.id)}
+
+    chunk = []
+    for row, record in enumerate(records, start=1):
+        try:
+            chunk.append((row, parse_shift_record(record, employee_ids, business_ids)))
+        except (ValueError, TypeError) as e:
+            result.reject(row, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            _insert_chunk(chunk, result)
+            chunk = []
+            if on_chunk is not None:
+                on_chunk(result)
+    if chunk:
+        _insert_chunk(chunk, result)
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _insert_chunk(chunk, result):
+    mappings = [m for _, m in chunk]
+    existing = existing_intervals({m['employee_id'] for m in mappings},
+                                  min(m['start_time'] for m in mappings),
+                                  max(m['finish_time'] for m in mappings))
+    conflicts = find_overlaps(mappings, existing)
+    for i in sorted(conflicts):
+        result.reject(chunk[i][0], conflicts[i])
+    mappings = [m for i, m in enumerate(mappings) if i not in conflicts]
+    if not mappings:
+        return
+
+    db.session.bulk_insert_mappings(Shift, mappings)
+    starts = [m['start_time'] for m in mappings]
+    employee_ids = {m['employee_id'] for m in mappings}
+    refresh_summary(employee_ids=employee_ids, since=min(starts), until=max(starts))
+    bump(*shift_scopes(employee_ids, {m['business_id'] for m in mappings}))
+    db.session.commit()
+    result.imported += len(mappings)
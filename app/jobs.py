@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+import signal
+import socket
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+import multiprocessing
+
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+
+from app import db
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+# Progress is written at most this often, however often a handler reports it.
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register `handler(payload, progress)` to run jobs of `kind`.
+
+    The payload is the dict given to `enqueue`; `progress(fraction, message)`
+    records how far along the job is. Whatever JSON-serialisable value the
+    handler returns is stored as the job's result. Handlers commit their own
+    work and may run more than once if an attempt fails, so they should be
+    safe to retry.
+    """
+    def decorator(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def enqueue(kind, payload=None, user_id=None, max_attempts=None, delay=0):
+    """Add a job to the session; it is queued when the caller commits.
+
+    Committing it in the same transaction as the write that needs it means
+    a job never refers to data that was rolled back.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'unknown job kind {kind!r}')
+    now = datetime.utcnow()
+    job = Job(kind=kind, payload=json.dumps(payload or {}), status=QUEUED, attempts=0,
+              max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+              run_after=now + timedelta(seconds=delay), user_id=user_id, created_at=now)
+    db.session.add(job)
+    return job
+
+
+def job_to_dict(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': job.progress,
+        'message': job.progress_message,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def job_files_dir():
+    """Directory for job inputs (uploaded imports) and outputs (exports), created on demand."""
+    path = current_app.config['JOB_FILES_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def claim_job(worker):
+    """Mark the next runnable job as running for `worker` and return its id, or None.
+
+    Runnable means queued and due, or running on a worker whose lease ran
+    out (it crashed or was killed). The claim is a conditional UPDATE, so
+    two workers racing for the same job can't both win; no row locks or
+    SKIP LOCKED needed, which keeps it working on SQLite.
+    """
+    now = datetime.utcnow()
+    lease_expired = now - timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+    runnable = or_(and_(Job.status == QUEUED, Job.run_after <= now),
+                   and_(Job.status == RUNNING, Job.started_at < lease_expired))
+    for _ in range(3):
+        job_id = db.session.execute(select(Job.id).where(runnable).order_by(Job.run_after, Job.id).limit(1)).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, runnable)
+            .values(status=RUNNING, worker=worker, started_at=now, attempts=Job.attempts + 1),
+            execution_options={'synchronize_session': False}).rowcount
+        db.session.commit()
+        if claimed:
+            return job_id
+    return None
+
+
+def _set_job(job_id, **values):
+    # Own short transaction, so status and progress are visible while the handler's work is not.
+    with db.engine.begin() as conn:
+        conn.execute(update(Job).where(Job.id == job_id).values(**values))
+
+
+class JobProgress(object):
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last = 0.0
+
+    def __call__(self, fraction=None, message=None):
+        now = time.monotonic()
+        if now - self._last < PROGRESS_INTERVAL_SECONDS and (fraction or 0) < 1:
+            return
+        self._last = now
+        _set_job(self.job_id, progress=None if fraction is None else min(max(fraction, 0.0), 1.0),
+                 progress_message=message[:200] if message else None)
+
+
+def execute_job(job_id):
+    """Run one claimed job and record the outcome; returns the final status.
+
+    A failed attempt is queued again after JOB_RETRY_BACKOFF_SECONDS,
+    doubling each time, until the job has had max_attempts.
+    """
+    job = db.session.get(Job, job_id)
+    kind, payload, attempts, max_attempts = job.kind, json.loads(job.payload), job.attempts, job.max_attempts
+    db.session.rollback()
+    try:
+        result = JOB_HANDLERS[kind](payload, JobProgress(job_id))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+        logger.warning('job %s (%s) attempt %s failed: %s', job_id, kind, attempts, error.strip().splitlines()[-1])
+        if attempts < max_attempts:
+            backoff = current_app.config['JOB_RETRY_BACKOFF_SECONDS'] * 2 ** (attempts - 1)
+            _set_job(job_id, status=QUEUED, error=error, worker=None,
+                     run_after=datetime.utcnow() + timedelta(seconds=backoff))
+            return QUEUED
+        _set_job(job_id, status=FAILED, error=error, finished_at=datetime.utcnow())
+        return FAILED
+    finally:
+        db.session.remove()
+    _set_job(job_id, status=DONE, progress=1.0, result=json.dumps(result), error=None,
+             finished_at=datetime.utcnow())
+    return DONE
+
+
+_worker_app = None
+
+
+def _init_pool_process():
+    global _worker_app
+    from app import create_app
+    _worker_app = create_app()
+    # The worker parent handles Ctrl+C and shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _run_in_pool(job_id):
+    with _worker_app.app_context():
+        return execute_job(job_id)
+
+
+def run_worker(processes=None, burst=False, poll_seconds=None):
+    """Claim jobs and run them, `processes` at a time, until interrupted.
+
+    Jobs run in a pool of fresh (spawned) processes, each with its own app and
+    database connections; processes=0 runs them one by one in this process
+    instead, which is handy locally and against SQLite. `burst` stops once
+    nothing is runnable. Returns the number of jobs run.
+    """
+    config = current_app.config
+    processes = config['JOB_WORKER_PROCESSES'] if processes is None else processes
+    poll_seconds = config['JOB_POLL_SECONDS'] if poll_seconds is None else poll_seconds
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+
+    ran = 0
+    if processes == 0:
+        while not stopping:
+            job_id = claim_job(worker)
+            if job_id is None:
+                if burst:
+                    break
+                time.sleep(poll_seconds)
+                continue
+            status = execute_job(job_id)
+            logger.info('job %s %s', job_id, status)
+            ran += 1
+        return ran
+
+    running = {}
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_pool_process) as pool:
+        try:
+            while not stopping:
+                job_id = claim_job(worker) if len(running) < processes else None
+                if job_id is not None:
+                    running[pool.submit(_run_in_pool, job_id)] = job_id
+                    continue
+                if not running:
+                    if burst:
+                        break
+                    time.sleep(poll_seconds)
+                    continue
+                done, _ = wait(running, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    ran += 1
+                    try:
+                        logger.info('job %s %s', job_id, future.result())
+                    except Exception:
+                        # The process died mid-job; the lease lets another claim retry it.
+                        logger.exception('job %s crashed its worker process', job_id)
+        except KeyboardInterrupt:
+            pass
+        # Let running jobs finish; unfinished claims are retried after their lease.
+        wait(running)
+    return ran + len(running)
+
+
+# Handlers
+
+@job_handler('refresh_summary')
+def refresh_summary_job(payload, progress):
+    """Recompute a slice of the labour cost rollup, e.g. after a backdated wage."""
+    from app.summary import refresh_summary
+    since, until = payload.get('since'), payload.get('until')
+    refresh_summary(employee_ids=payload.get('employee_ids'), business_ids=payload.get('business_ids'),
+                    since=datetime.fromisoformat(since) if since else None,
+                    until=datetime.fromisoformat(until) if until else None)
+    db.session.commit()
+
+
+@job_handler('import_shifts')
+def import_shifts_job(payload, progress):
+    """Import an uploaded file saved under job_files_dir(); the file is removed once imported.
+
+    A retried import re-reads the whole file, and rows committed by the
+    failed attempt are rejected as overlapping, so nothing is imported twice.
+    """
+    import io
+    from app.importer import import_shifts, read_records
+    path = os.path.join(job_files_dir(), payload['file'])
+    size = os.path.getsize(path) or 1
+    with open(path, 'rb') as raw:
+        stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        result = import_shifts(read_records(stream, payload['format']), on_chunk=lambda r: progress(
+            raw.tell() / size, f'{r.imported} imported, {r.rejected} rejected'))
+    os.remove(path)
+    return {'imported': result.imported, 'rejected': result.rejected, 'errors': result.errors,
+            'summary': result.summary()}
+
+
+@job_handler('export_shifts')
+def export_shifts_job(payload, progress):
+    """Write a shift CSV export to a file under job_files_dir() for /jobs/<id>/download."""
+    import uuid
+    from datetime import date
+    from app.export import iter_shifts_csv
+    from app.queries import shift_export_query
+    since, until = payload.get('since'), payload.get('until')
+    query = shift_export_query(employee_id=payload.get('employee_id'), business_id=payload.get('business_id'),
+                               since=date.fromisoformat(since) if since else None,
+                               until=date.fromisoformat(until) if until else None)
+    filename = f'export-{uuid.uuid4().hex}.csv'
+    written = 0
+    with open(os.path.join(job_files_dir(), filename), 'w', encoding='utf-8', newline='') as f:
+        for chunk in iter_shifts_csv(query, excel=payload.get('excel', False)):
+            f.write(chunk)
+            written += len(chunk)
+            progress(None, f'{written // 1024} KiB written')
+    db.session.rollback()
+    return {'file': filename, 'bytes': written}
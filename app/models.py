@@ -1,24 +1,42 @@
-from app import db, login
+from app import db, login, cache, password_hasher
+from flask import current_app, g, has_request_context
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import contains_eager, joinedload
 from datetime import datetime, timedelta
+from app.costing import WageIndex, hours_between, hourly_rate_expression
+import threading
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True)
     email = db.Column(db.String(120), index=True, unique=True)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256))
     roles = db.relationship('Role', secondary='user_roles')
 
+    # Filled in by load_user from the role cache, or computed on first use.
+    _role_names = None
+
     def __repr__(self):
         return f'<User {self.username}>'
 
+    @property
+    def role_names(self):
+        if self._role_names is None:
+            self._role_names = frozenset(r.name for r in self.roles)
+        return self._role_names
+
+    def has_role(self, role):
+        return role in self.role_names or 'Admin' in self.role_names
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
 
 class Role(db.Model):
@@ -34,9 +52,24 @@ class UserRoles(db.Model):
     role_id = db.Column(db.Integer(), db.ForeignKey('roles.id', ondelete='CASCADE'))
 
 
+def user_roles_cache_key(user_id):
+    return f'user_roles:{user_id}'
+
+
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    user_id = int(id)
+    role_names = cache.get(user_roles_cache_key(user_id))
+    if role_names is not None:
+        user = User.query.get(user_id)
+        if user is not None:
+            user._role_names = role_names
+        return user
+
+    user = User.query.options(joinedload(User.roles)).get(user_id)
+    if user is not None:
+        cache.set(user_roles_cache_key(user_id), user.role_names, ttl=current_app.config['USER_ROLES_CACHE_TTL'])
+    return user
 
 
 class Business(db.Model):
@@ -52,10 +85,14 @@ class Employee(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     firstname = db.Column(db.String(64), index=True, nullable=False)
     lastname = db.Column(db.String(64), index=True, nullable=False)
-    wages = db.relationship('Wage', backref='employee', lazy=False)
+    wages = db.relationship('Wage', backref='employee', lazy=True)
     shifts = db.relationship('Shift', backref='employee', lazy=True)
     fullname = db.column_property(firstname + " " + lastname)
 
+    __table_args__ = (
+        db.UniqueConstraint('firstname', 'lastname', name='uq_employee_firstname_lastname'),
+    )
+
     def __repr__(self):
         return f'<Employee {self.firstname} {self.lastname}>'
 
@@ -67,6 +104,12 @@ class Shift(db.Model):
     start_time = db.Column(db.DateTime, nullable=False)
     finish_time = db.Column(db.DateTime, nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_shift_employee_id_start_time', 'employee_id', 'start_time'),
+        db.Index('ix_shift_business_id_start_time', 'business_id', 'start_time'),
+        db.Index('ix_shift_start_time', 'start_time'),
+    )
+
     def __repr__(self):
         return f'<Shift {self.id}>'
 
@@ -76,17 +119,53 @@ class Shift(db.Model):
         length_in_hours = td.total_seconds() / 3600
         return length_in_hours
 
+    @shift_length.expression
+    def shift_length(cls):
+        return hours_between(cls.start_time, cls.finish_time)
+
     @hybrid_property
     def shift_cost(self):
-        e = Employee.query.filter_by(id=self.employee_id).first()
-        wage = 10.42
-        for w in e.wages:
-            if w.valid_from < self.start_time and (w.is_current or (w.valid_to is not None and w.valid_to > self.finish_time)):
-                wage = w.hourly_rate
-            else:
-                wage = 10.42
+        return wage_index().cost(self.employee_id, self.start_time, self.finish_time)
+
+    @shift_cost.expression
+    def shift_cost(cls):
+        return cls.shift_length * hourly_rate_expression(Wage, cls)
+
+    @staticmethod
+    def loader_options(profile, shift=None):
+        """Eager-loading bundle for a named way of reading shifts.
+
+        'grid' is for queries that already join business and employee
+        (queries.shift_grid_query): both relationships are populated from
+        those joins and wages are never loaded, as costs come from SQL.
+        `shift` is the entity queried, when it is an alias of Shift such as
+        archive.all_shifts().
+        """
+        shift = shift or Shift
+        if profile == 'grid':
+            return (contains_eager(shift.business),
+                    contains_eager(shift.employee).lazyload(Employee.wages))
+        raise ValueError(f'unknown shift loader profile {profile!r}')
+
+
+class ShiftArchive(db.Model):
+    """Shifts moved out of `shift` by `flask shifts archive`, with the same columns and ids.
+
+    Queried together with `shift` through archive.shift_source when a date
+    range reaches back into archived periods.
+    """
+    __tablename__ = 'shift_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    business_id = db.Column(db.Integer, db.ForeignKey('business.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    finish_time = db.Column(db.DateTime, nullable=False)
 
-        return self.shift_length * wage
+    __table_args__ = (
+        db.Index('ix_shift_archive_employee_id_start_time', 'employee_id', 'start_time'),
+        db.Index('ix_shift_archive_business_id_start_time', 'business_id', 'start_time'),
+        db.Index('ix_shift_archive_start_time', 'start_time'),
+    )
 
 
 class Wage(db.Model):
@@ -96,3 +175,101 @@ class Wage(db.Model):
     valid_from = db.Column(db.DateTime, nullable=False)
     valid_to = db.Column(db.DateTime, nullable=True)
     is_current = db.Column(db.Boolean, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_wage_employee_id_validity', 'employee_id', 'valid_from', 'valid_to', 'is_current'),
+        # At most one current wage per employee.
+        db.Index('uq_wage_current_employee_id', 'employee_id', unique=True,
+                 sqlite_where=db.text('is_current = 1'), postgresql_where=db.text('is_current')),
+    )
+
+
+class Job(db.Model):
+    """A unit of background work, queued by the web app and run by `flask worker` (app.jobs)."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_after = db.Column(db.DateTime, nullable=False)
+    progress = db.Column(db.Float, nullable=True)
+    progress_message = db.Column(db.String(200), nullable=True)
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    worker = db.Column(db.String(64), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+
+class DataVersion(db.Model):
+    """Change counter for one scope of data ('global', 'employee:<id>', 'business:<id>', 'wages').
+
+    Bumped by app.versions in the same transaction as the write, and used
+    for ETags and as the key of cached fragments.
+    """
+    __tablename__ = 'data_version'
+    scope = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+class LabourCostSummary(db.Model):
+    """Hours, cost and shift count per business, employee and day, maintained by app.summary."""
+    __tablename__ = 'labour_cost_summary'
+    business_id = db.Column(db.Integer, db.ForeignKey('business.id'), primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    hours = db.Column(db.Float, nullable=False, default=0)
+    cost = db.Column(db.Float, nullable=False, default=0)
+    shift_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class WageIndexCache(object):
+    """An app's WageIndex and the 'wages' data version it was built at, in app.extensions['wage_index']."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.version = None
+
+
+def wage_index():
+    """The app's WageIndex, rebuilt from one wage query after any wage change.
+
+    Checked against the 'wages' data version (app.versions), which every
+    wage write bumps in its own transaction, so a change made by one worker
+    makes every worker rebuild. The check is a primary key lookup, done once
+    per request: the index is kept on `g`, so pricing shifts one at a time
+    through Shift.shift_cost costs no further queries.
+    """
+    if not has_request_context():
+        return _current_wage_index()
+    if 'wage_index' not in g:
+        g.wage_index = _current_wage_index()
+    return g.wage_index
+
+
+def _current_wage_index():
+    from app.versions import WAGES_SCOPE
+    cached = current_app.extensions['wage_index']
+    version = db.session.query(DataVersion.version).filter_by(scope=WAGES_SCOPE).scalar()
+    index = cached.index
+    if index is not None and version == cached.version:
+        return index
+    with cached.lock:
+        if cached.index is None or version != cached.version:
+            rows = db.session.query(Wage.employee_id, Wage.valid_from, Wage.valid_to,
+                                    Wage.is_current, Wage.hourly_rate)
+            cached.index = WageIndex(rows)
+            cached.version = version
+        return cached.index
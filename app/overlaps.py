@@ -0,0 +1,84 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import and_
+
+from app import db
+from app.models import Shift
+from app.archive import shift_source
+
+# Longest shift accepted. Bounding shift length lets an overlap check read
+# only the slice of (employee_id, start_time) index starting at most this
+# long before the new shift, instead of every earlier shift.
+MAX_SHIFT_HOURS = 24
+MAX_SHIFT_LENGTH = timedelta(hours=MAX_SHIFT_HOURS)
+
+
+def overlap_clause(employee_id, start_time, finish_time, shift=Shift):
+    """Shifts of the employee that overlap [start_time, finish_time).
+
+    `start_time < finish AND finish_time > start` is the overlap test; the
+    lower bound on start_time is implied by MAX_SHIFT_LENGTH and turns it
+    into a range scan of ix_shift_employee_id_start_time.
+    """
+    return and_(shift.employee_id == employee_id,
+                shift.start_time > start_time - MAX_SHIFT_LENGTH,
+                shift.start_time < finish_time,
+                shift.finish_time > start_time)
+
+
+def overlapping_shifts(employee_id, start_time, finish_time, exclude_id=None):
+    shift = shift_source(start_time - MAX_SHIFT_LENGTH)
+    query = db.session.query(shift).filter(overlap_clause(employee_id, start_time, finish_time, shift))
+    if exclude_id is not None:
+        query = query.filter(shift.id != exclude_id)
+    return query.order_by(shift.start_time)
+
+
+def existing_intervals(employee_ids, since, until):
+    """{employee_id: [(start, finish), ...]} sorted by start, for shifts that could overlap [since, until)."""
+    shift = shift_source(since - MAX_SHIFT_LENGTH)
+    rows = db.session.query(shift.employee_id, shift.start_time, shift.finish_time) \
+        .filter(shift.employee_id.in_(list(employee_ids)),
+                shift.start_time > since - MAX_SHIFT_LENGTH,
+                shift.start_time < until) \
+        .order_by(shift.employee_id, shift.start_time)
+    intervals = defaultdict(list)
+    for employee_id, start_time, finish_time in rows:
+        intervals[employee_id].append((start_time, finish_time))
+    return intervals
+
+
+def find_overlaps(shifts, existing):
+    """Sort-and-sweep overlap check for a batch of new shifts.
+
+    `shifts` are mappings with employee_id, start_time and finish_time;
+    `existing` is what `existing_intervals` returns for them. Returns
+    {position in `shifts`: message} for every new shift that overlaps an
+    existing one, or an earlier-starting new one that was accepted.
+    """
+    by_employee = defaultdict(list)
+    for i, shift in enumerate(shifts):
+        by_employee[shift['employee_id']].append((shift['start_time'], shift['finish_time'], i))
+
+    conflicts = {}
+    for employee_id, batch in by_employee.items():
+        batch.sort()
+        taken = existing.get(employee_id, [])
+        starts = [start for start, _ in taken]
+        # reach[k]: latest finish among the first k + 1 existing shifts
+        reach = []
+        for _, finish in taken:
+            reach.append(max(finish, reach[-1]) if reach else finish)
+
+        accepted_until = None
+        for start, finish, i in batch:
+            before = bisect_left(starts, finish)
+            if before and reach[before - 1] > start:
+                conflicts[i] = f'overlaps an existing shift for employee {employee_id}'
+            elif accepted_until is not None and start < accepted_until:
+                conflicts[i] = f'overlaps another imported shift for employee {employee_id}'
+            else:
+                accepted_until = finish if accepted_until is None else max(accepted_until, finish)
+    return conflicts
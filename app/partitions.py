@@ -0,0 +1,115 @@
+import re
+from datetime import date, datetime, time
+
+from sqlalchemy import text
+
+from app import db
+
+# Rows outside every monthly partition land here until `flask shifts partitions` gives them one.
+DEFAULT_PARTITION = 'shift_default'
+_PARTITION_NAME = re.compile(r'^shift_y(\d{4})m(\d{2})$')
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(first, last):
+    """First days of every month from `first`'s to `last`'s, inclusive."""
+    month, last = month_start(first), month_start(last)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(month):
+    return f'shift_y{month:%Y}m{month:%m}'
+
+
+def shift_is_partitioned():
+    """Whether `shift` is a partitioned table, i.e. PostgreSQL after the partitioning migration."""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'shift'::regclass)")).scalar()
+
+
+def monthly_partitions():
+    """{first day of month: partition name} for the monthly partitions of shift."""
+    names = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'shift'::regclass")).scalars()
+    partitions = {}
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(month):
+    """Add the partition for `month`, moving its rows out of the default partition.
+
+    A partition can't be attached while the default one holds rows in its
+    range, so the default is detached, emptied of that month and attached
+    again, all in the caller's transaction. That locks `shift`, so run it
+    off-peak. Each partition gets its own overlap exclusion constraint, as
+    PostgreSQL has none spanning partitions; app.overlaps still checks
+    shifts that cross a month boundary.
+    """
+    name = partition_name(month)
+    lower = datetime.combine(month, time.min)
+    upper = datetime.combine(add_months(month, 1), time.min)
+    bounds = {'lower': lower, 'upper': upper}
+    db.session.execute(text(f'ALTER TABLE shift DETACH PARTITION {DEFAULT_PARTITION}'))
+    db.session.execute(text(f"CREATE TABLE {name} PARTITION OF shift "
+                            f"FOR VALUES FROM ('{lower.isoformat(' ')}') TO ('{upper.isoformat(' ')}')"))
+    db.session.execute(text(f'ALTER TABLE {name} ADD CONSTRAINT ex_{name}_employee_id_overlap '
+                            f'EXCLUDE USING gist (employee_id WITH =, tsrange(start_time, finish_time) WITH &&)'))
+    db.session.execute(text(
+        f'INSERT INTO {name} (id, employee_id, business_id, start_time, finish_time) '
+        f'SELECT id, employee_id, business_id, start_time, finish_time FROM {DEFAULT_PARTITION} '
+        f'WHERE start_time >= :lower AND start_time < :upper'), bounds)
+    db.session.execute(text(
+        f'DELETE FROM {DEFAULT_PARTITION} WHERE start_time >= :lower AND start_time < :upper'), bounds)
+    db.session.execute(text(f'ALTER TABLE shift ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT'))
+    return name
+
+
+def ensure_partitions(until):
+    """Create the missing monthly partitions up to `until`'s month; returns their names.
+
+    Starts from the oldest month with rows in the default partition, or the
+    current month. Each partition is committed on its own.
+    """
+    oldest = db.session.execute(text(f'SELECT min(start_time) FROM {DEFAULT_PARTITION}')).scalar()
+    first = min(oldest.date(), date.today()) if oldest else date.today()
+    existing = monthly_partitions()
+    created = []
+    for month in month_range(first, until):
+        if month not in existing:
+            created.append(create_partition(month))
+            db.session.commit()
+    return created
+
+
+def drop_empty_partitions(before):
+    """Drop the monthly partitions that end by `before` and hold no rows; returns their names.
+
+    Called after archiving, which leaves those months empty.
+    """
+    dropped = []
+    for month, name in sorted(monthly_partitions().items()):
+        if add_months(month, 1) > before:
+            continue
+        if db.session.execute(text(f'SELECT EXISTS (SELECT 1 FROM {name})')).scalar():
+            continue
+        db.session.execute(text(f'ALTER TABLE shift DETACH PARTITION {name}'))
+        db.session.execute(text(f'DROP TABLE {name}'))
+        dropped.append(name)
+    return dropped
@@ -0,0 +1,191 @@
+import json
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from types import GeneratorType
+
+from flask import current_app, g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile(object):
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.statements = []
+        self._template_depth = 0
+
+    def add_query(self, statement, ms):
+        self.queries += 1
+        self.db_ms += ms
+        self.statements.append((ms, statement))
+
+    @contextmanager
+    def timing_template(self):
+        # Only the outermost template counts, so a page rendering partials
+        # (like the streamed shift table) isn't timed twice.
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template_ms += (time.perf_counter() - started) * 1000
+
+
+def _current_profile():
+    return g.get('_profile') if has_request_context() else None
+
+
+class ProfiledTemplate(Template):
+    """Template that adds its render time to the current request's profile."""
+
+    def render(self, *args, **kwargs):
+        profile = _current_profile()
+        if profile is None:
+            return super().render(*args, **kwargs)
+        with profile.timing_template():
+            return super().render(*args, **kwargs)
+
+    def generate(self, *args, **kwargs):
+        # Used by stream_template. Each chunk is timed while it is produced,
+        # leaving out the time spent sending it between chunks.
+        chunks = super().generate(*args, **kwargs)
+        while True:
+            profile = _current_profile()
+            if profile is None:
+                chunk = next(chunks, None)
+            else:
+                with profile.timing_template():
+                    chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_profile_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_profile_query_start')
+    if not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    profile = _current_profile()
+    if profile is not None:
+        profile.add_query(statement, ms)
+
+
+class ProfilerState(object):
+    """One app's profiling settings and its recent request records, kept in app.extensions['profiler']."""
+
+    def __init__(self, config):
+        self.enabled = config.get('PROFILING_ENABLED', False)
+        self.recent = deque(maxlen=config.get('PROFILING_HISTORY', 200))
+        self.slow_statements = config.get('PROFILING_SLOW_QUERIES', 5)
+        self.request_budget_ms = config.get('PROFILING_REQUEST_BUDGET_MS')
+        self.query_budget = config.get('PROFILING_QUERY_BUDGET')
+
+    def record(self, profile, request_info):
+        """Log the request's profile and add it to `recent`; returns its total time in ms."""
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        slowest = sorted(profile.statements, key=lambda s: s[0], reverse=True)[:self.slow_statements]
+
+        over_budget = []
+        if self.request_budget_ms is not None and total_ms > self.request_budget_ms:
+            over_budget.append('time')
+        if self.query_budget is not None and profile.queries > self.query_budget:
+            over_budget.append('queries')
+
+        record = dict(request_info, **{
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(profile.db_ms, 2),
+            'queries': profile.queries,
+            'template_ms': round(profile.template_ms, 2),
+            'slowest': [{'ms': round(ms, 2), 'statement': statement} for ms, statement in slowest],
+            'over_budget': over_budget,
+        })
+        self.recent.append(record)
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
+        return total_ms
+
+
+class RequestProfiler(object):
+    """Opt-in per-request SQL and template timing.
+
+    When PROFILING_ENABLED is set every request gets a Server-Timing header
+    and a JSON log line on the `app.profiling` logger (a warning when it goes
+    over PROFILING_REQUEST_BUDGET_MS or PROFILING_QUERY_BUDGET), and the last
+    PROFILING_HISTORY requests are kept in `recent` for /_debug/requests.
+    Responses generated as they are sent are recorded once they finish, and
+    have no Server-Timing header. Settings and history are per app.
+    """
+
+    _engine_events_registered = False
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        state = app.extensions['profiler'] = ProfilerState(app.config)
+        if not state.enabled:
+            return
+
+        app.jinja_env.template_class = ProfiledTemplate
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not RequestProfiler._engine_events_registered:
+            # Listening on the Engine class covers every engine, including
+            # binds created after this point.
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            RequestProfiler._engine_events_registered = True
+
+    @property
+    def enabled(self):
+        return current_app.extensions['profiler'].enabled
+
+    @property
+    def recent(self):
+        return current_app.extensions['profiler'].recent
+
+    def _start_request(self):
+        g._profile = RequestProfile()
+
+    def _finish_request(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        state = current_app.extensions['profiler']
+        request_info = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+        }
+        if isinstance(response.response, GeneratorType):
+            # The body (a stream_template page, say) is generated after this
+            # hook, so keep collecting into the profile and record it once the
+            # response is closed. Its headers are already gone by then, so
+            # streamed responses get no Server-Timing.
+            g._profile = profile
+            response.call_on_close(lambda: state.record(profile, request_info))
+            return response
+
+        total_ms = state.record(profile, request_info)
+        response.headers.add('Server-Timing', f'db;dur={profile.db_ms:.2f};desc="{profile.queries} queries"')
+        response.headers.add('Server-Timing', f'tpl;dur={profile.template_ms:.2f}')
+        response.headers.add('Server-Timing', f'total;dur={total_ms:.2f}')
+        return response
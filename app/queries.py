@@ -0,0 +1,97 @@
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import func, or_
+
+from app import db
+from app.models import Business, Employee, Shift
+from app.archive import shift_source
+
+# Public sort keys accepted by the shifts API, mapped to the SQL they order by;
+# strings name attributes of the shift entity being queried.
+SHIFT_SORT_COLUMNS = {
+    'start': 'start_time',
+    'finish': 'finish_time',
+    'length': 'shift_length',
+    'cost': 'shift_cost',
+    'business': Business.name,
+    'employee': Employee.fullname,
+}
+DEFAULT_SHIFT_SORT = '-start'
+
+
+def filter_shifts(query, shift_id=None, employee_id=None, business_id=None, since=None, until=None, shift=Shift):
+    """Apply the common shift filters to `shift` (Shift or a shift_source alias).
+
+    `since` and `until` are inclusive dates of the shift start.
+    """
+    if shift_id is not None:
+        query = query.filter(shift.id == shift_id)
+    if employee_id is not None:
+        query = query.filter(shift.employee_id == employee_id)
+    if business_id is not None:
+        query = query.filter(shift.business_id == business_id)
+    if since is not None:
+        query = query.filter(shift.start_time >= datetime.combine(since, time.min))
+    if until is not None:
+        query = query.filter(shift.start_time < datetime.combine(until + timedelta(days=1), time.min))
+    return query
+
+
+def shift_grid_query(search=None, sort=None, **filters):
+    """Shifts joined to their business and employee, filtered, searched and sorted in SQL.
+
+    Rows load with the 'grid' profile, so reading `shift.business` or
+    `shift.employee` never issues another query.
+
+    `sort` is one of SHIFT_SORT_COLUMNS, prefixed with '-' for descending.
+    Unknown sort keys fall back to DEFAULT_SHIFT_SORT. Archived shifts are
+    included when the range reaches back into the archive.
+    """
+    shift = shift_source(filters.get('since'))
+    query = filter_shifts(db.session.query(shift).join(shift.business).join(shift.employee), shift=shift,
+                          **filters) \
+        .options(*Shift.loader_options('grid', shift))
+    if search:
+        pattern = f'%{search}%'
+        query = query.filter(or_(Business.name.ilike(pattern), Employee.fullname.ilike(pattern)))
+
+    sort = sort or DEFAULT_SHIFT_SORT
+    descending = sort.startswith('-')
+    column = SHIFT_SORT_COLUMNS.get(sort.lstrip('-'))
+    if column is None:
+        descending, column = True, SHIFT_SORT_COLUMNS[DEFAULT_SHIFT_SORT.lstrip('-')]
+    if isinstance(column, str):
+        column = getattr(shift, column)
+    # id as a tie breaker keeps pages stable when the sort column has duplicates
+    return query.order_by(column.desc() if descending else column.asc(),
+                          shift.id.desc() if descending else shift.id.asc())
+
+
+def shift_page(query, limit, offset):
+    """(total, [(shift, cost), ...]) for one page of a shift_grid_query.
+
+    The total comes from a COUNT(*) OVER () window on the page query itself,
+    so a page costs one round trip; only a page past the end needs a
+    separate count.
+    """
+    shift = query.column_descriptions[0]['entity']
+    rows = query.add_columns(shift.shift_cost.label('cost'), func.count().over().label('total')) \
+        .limit(limit).offset(offset).all()
+    if rows:
+        total = rows[0].total
+    else:
+        total = query.order_by(None).count() if offset else 0
+    return total, [(row[0], row.cost) for row in rows]
+
+
+def shift_export_query(**filters):
+    """Flat (id, business, employee, start, finish, hours, employee id) rows in start order.
+
+    Costs aren't selected: a correlated wage subquery per row is most of the
+    query's time on long ranges, so readers price rows from models.wage_index().
+    """
+    shift = shift_source(filters.get('since'))
+    query = db.session.query(shift.id, Business.name, Employee.fullname, shift.start_time,
+                             shift.finish_time, shift.shift_length, shift.employee_id) \
+        .select_from(shift).join(shift.business).join(shift.employee)
+    return filter_shifts(query, shift=shift, **filters).order_by(shift.start_time, shift.id)
@@ -0,0 +1,304 @@
+from flask import Blueprint, current_app, render_template, flash, redirect, url_for, request, abort, jsonify, \
+    Response, stream_with_context, stream_template, send_from_directory
+from flask_login import current_user, login_required
+from sqlalchemy.exc import IntegrityError
+from markupsafe import Markup
+from werkzeug.local import LocalProxy
+from datetime import date, datetime
+import json
+import os
+import uuid
+
+from app import db
+from app.auth import requires_role
+from app.choices import TYPEAHEAD_LIMIT, TYPEAHEAD_SOURCES, business_choices, typeahead
+from app.forms import NewShiftForm, ImportShiftsForm
+from app.models import Job, Shift, wage_index
+from app.queries import shift_grid_query, shift_page, shift_export_query
+from app.export import coalesce_chunks, iter_batches, iter_shifts_csv
+from app.humanize import relative_times
+from app.summary import refresh_summary, period_bounds, business_costs
+from app.engine import read_replica
+from app.importer import format_for_filename
+from app.jobs import enqueue, job_files_dir, job_to_dict
+from app.versions import GLOBAL_SCOPE, WAGES_SCOPE, business_scope, employee_scope, shift_scopes, bump, \
+    conditional, cached_fragment
+
+bp = Blueprint('rota', __name__)
+
+SHIFTS_PAGE_SIZE = 25
+SHIFTS_MAX_PAGE_SIZE = 100
+
+LABOUR_COST_PERIODS = ('week', 'month')
+
+
+@bp.app_context_processor
+def inject_businesses_list():
+    # Resolved on first use, so templates that never touch the list never query for it.
+    return dict(businesses_list=LocalProxy(business_choices.choices))
+
+
+@bp.route('/')
+@bp.route('/index')
+@login_required
+def index():
+
+    return render_template('index.html', title='Home')
+
+
+@bp.route('/dashboard')
+@login_required
+@read_replica
+def dashboard():
+    periods = {period: period_bounds(period) for period in LABOUR_COST_PERIODS}
+    costs = {period: business_costs(*bounds) for period, bounds in periods.items()}
+    return render_template('dashboard.html', title='Labour costs', periods=periods, costs=costs)
+
+
+@bp.route('/api/labour_costs')
+@login_required
+@read_replica
+def api_labour_costs():
+    period = request.args.get('period', 'week')
+    if period not in LABOUR_COST_PERIODS:
+        abort(400)
+    first, last = period_bounds(period)
+    return jsonify(period=period, start=first.isoformat(), end=last.isoformat(), businesses=[
+        {'business_id': id, 'business': name, 'hours': round(hours, 2), 'cost': round(cost, 2), 'shifts': shifts}
+        for id, name, hours, cost, shifts in business_costs(first, last)])
+
+
+def _shift_list_scopes(employee_id=None, business_id=None):
+    # Business pages show other employees' costs, so any wage change affects them.
+    scopes = []
+    if employee_id is not None:
+        scopes.append(employee_scope(employee_id))
+    if business_id is not None:
+        scopes += [business_scope(business_id), WAGES_SCOPE]
+    return scopes or [GLOBAL_SCOPE]
+
+
+@bp.route('/list_shifts', methods=['GET', 'POST'])
+@login_required
+@conditional(_shift_list_scopes)
+def list_shifts():
+    return render_template('shifts.html', title='Shifts list', data_url=url_for('rota.api_shifts'),
+                           export_url=url_for('rota.export_shifts_csv'), table_url=url_for('rota.shifts_table'))
+
+
+@bp.route('/shift/<int:shift_id>', methods=['GET', 'POST'])
+@login_required
+@conditional(_shift_list_scopes)
+def shift(shift_id):
+    return render_template('shifts.html', title='Shifts list', data_url=url_for('rota.api_shifts', shift_id=shift_id))
+
+
+@bp.route('/employee/<int:employee_id>', methods=['GET', 'POST'])
+@login_required
+@conditional(lambda: _shift_list_scopes(employee_id=request.view_args['employee_id']))
+def employee(employee_id):
+    return render_template('shifts.html', title='Shifts list',
+                           data_url=url_for('rota.api_shifts', employee_id=employee_id),
+                           export_url=url_for('rota.export_shifts_csv', employee_id=employee_id),
+                           table_url=url_for('rota.shifts_table', employee_id=employee_id))
+
+
+@bp.route('/business/<int:business_id>', methods=['GET', 'POST'])
+@login_required
+@conditional(lambda: _shift_list_scopes(business_id=request.view_args['business_id']))
+def business(business_id):
+    return render_template('shifts.html', title='Shifts list',
+                           data_url=url_for('rota.api_shifts', business_id=business_id),
+                           export_url=url_for('rota.export_shifts_csv', business_id=business_id),
+                           table_url=url_for('rota.shifts_table', business_id=business_id))
+
+
+@bp.route('/api/shifts')
+@login_required
+@read_replica
+@conditional(lambda: _shift_list_scopes(employee_id=request.args.get('employee_id', type=int),
+                                        business_id=request.args.get('business_id', type=int)))
+def api_shifts():
+    limit = request.args.get('limit', SHIFTS_PAGE_SIZE, type=int)
+    if limit <= 0:
+        limit = SHIFTS_PAGE_SIZE
+    limit = min(limit, SHIFTS_MAX_PAGE_SIZE)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    def render():
+        query = shift_grid_query(shift_id=request.args.get('shift_id', type=int),
+                                 employee_id=request.args.get('employee_id', type=int),
+                                 business_id=request.args.get('business_id', type=int),
+                                 search=request.args.get('search', '').strip(),
+                                 sort=request.args.get('sort'))
+        total, rows = shift_page(query, limit, offset)
+        return current_app.json.dumps(dict(count=total, limit=limit, offset=offset,
+                                           results=[shift_to_dict(shift, cost) for shift, cost in rows]))
+
+    body = cached_fragment(('api_shifts', sorted(request.args.items(multi=True)), limit, offset), render)
+    return current_app.response_class(body, mimetype='application/json')
+
+
+def _export_filters():
+    # from/to are inclusive ISO dates; invalid values are ignored like other bad filters
+    return dict(employee_id=request.args.get('employee_id', type=int),
+                business_id=request.args.get('business_id', type=int),
+                since=request.args.get('from', type=date.fromisoformat),
+                until=request.args.get('to', type=date.fromisoformat))
+
+
+def _table_row_batches(query):
+    # Each batch renders to a single string (relative start times are worked out for
+    # the whole batch); yielding row by row through the page's nested blocks costs
+    # more than rendering the rows.
+    now = datetime.now()
+    index = wage_index()
+    for batch in iter_batches(query):
+        costs = [index.cost(row.employee_id, row.start_time, row.finish_time) for row in batch]
+        yield Markup(render_template('_shift_rows.html',
+                                     rows=zip(batch, costs, relative_times([row.start_time for row in batch], now))))
+
+
+@bp.route('/shifts/table')
+@login_required
+@read_replica
+def shifts_table():
+    """Every matching shift as one server-rendered table, streamed as it is read.
+
+    Rows come off a server-side cursor in batches and the page is sent as it
+    renders, so memory use and time to first byte don't grow with the
+    number of shifts. Takes the same filters as the CSV export.
+    """
+    filters = _export_filters()
+    chunks = stream_template('shifts_table.html', title='Shifts table',
+                             row_batches=_table_row_batches(shift_export_query(**filters)),
+                             export_url=url_for('rota.export_shifts_csv', **request.args))
+    return current_app.response_class(coalesce_chunks(chunks), mimetype='text/html')
+
+
+@bp.route('/export/shifts.csv')
+@login_required
+@read_replica
+def export_shifts_csv():
+    filters = _export_filters()
+    excel = request.args.get('excel', type=int) == 1
+    if request.args.get('background', type=int) == 1:
+        # Long ranges are written to a file by a worker and downloaded from the job page.
+        payload = dict(filters, since=filters['since'] and filters['since'].isoformat(),
+                       until=filters['until'] and filters['until'].isoformat(), excel=excel)
+        job = enqueue('export_shifts', payload, user_id=current_user.id)
+        # Read the job back before committing: afterwards it is expired, and
+        # reloading it here would query a replica that may not have it yet.
+        db.session.flush()
+        status_url = url_for('rota.job_status', job_id=job.id)
+        body = dict(job_to_dict(job), status_url=status_url)
+        db.session.commit()
+        return jsonify(body), 202, {'Location': status_url}
+    rows = iter_shifts_csv(shift_export_query(**filters), excel=excel)
+    return Response(stream_with_context(rows), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=shifts.csv'})
+
+
+def _visible_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None:
+        abort(404)
+    if job.user_id != current_user.id and not current_user.has_role('Admin'):
+        abort(401)
+    return job
+
+
+@bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    return render_template('job.html', title='Job status', job=_visible_job(job_id))
+
+
+@bp.route('/api/jobs/<int:job_id>')
+@login_required
+def api_job(job_id):
+    return jsonify(job_to_dict(_visible_job(job_id)))
+
+
+@bp.route('/jobs/<int:job_id>/download')
+@login_required
+def download_job_file(job_id):
+    job = _visible_job(job_id)
+    if job.status != 'done' or job.kind != 'export_shifts':
+        abort(404)
+    return send_from_directory(job_files_dir(), json.loads(job.result)['file'], as_attachment=True,
+                               download_name='shifts.csv', mimetype='text/csv')
+
+
+@bp.route('/api/choices/<kind>')
+@login_required
+def api_choices(kind):
+    if kind not in TYPEAHEAD_SOURCES:
+        abort(404)
+    if kind == 'users' and not current_user.has_role('Admin'):
+        abort(401)
+    limit = min(max(request.args.get('limit', TYPEAHEAD_LIMIT, type=int), 1), TYPEAHEAD_LIMIT)
+    return jsonify(results=[{'id': choice.id, 'name': choice.name}
+                            for choice in typeahead(kind, request.args.get('q', ''), limit)])
+
+
+def shift_to_dict(shift, cost):
+    return {
+        'id': shift.id,
+        'business': shift.business.name,
+        'business_id': shift.business_id,
+        'employee': shift.employee.fullname,
+        'employee_id': shift.employee_id,
+        'start_time': str(shift.start_time),
+        'finish_time': str(shift.finish_time),
+        'length': round(shift.shift_length, 2),
+        'cost': round(cost, 2),
+        'shift_url': url_for('rota.shift', shift_id=shift.id),
+        'employee_url': url_for('rota.employee', employee_id=shift.employee_id),
+        'business_url': url_for('rota.business', business_id=shift.business_id),
+    }
+
+
+@bp.route('/new_shift', methods=['GET', 'POST'])
+@login_required
+@requires_role('Manager')
+def new_shift():
+    form = NewShiftForm()
+    if form.validate_on_submit():
+        shift = Shift(start_time=form.start_time.data,
+                      finish_time=form.finish_time.data,
+                      employee_id=form.employee_id.data,
+                      business_id=form.business_id.data)
+        try:
+            db.session.add(shift)
+            refresh_summary(employee_ids=[shift.employee_id], business_ids=[shift.business_id],
+                            since=shift.start_time, until=shift.start_time)
+            bump(*shift_scopes([shift.employee_id], [shift.business_id]))
+            db.session.commit()
+        except IntegrityError:
+            # Another booking for the employee was committed after the form
+            # checked for overlaps, and the exclusion constraint rejected this
+            # one, when refresh_summary flushed it or at the commit.
+            db.session.rollback()
+            form.finish_time.errors.append(form.booking_clash() or 'Employee is already booked at this time.')
+            return render_template('new_shift.html', title='New shift', form=form)
+        flash(f'New shift successfully added!')
+        return redirect(url_for('rota.new_shift'))
+    return render_template('new_shift.html', title='New shift', form=form)
+
+
+@bp.route('/import_shifts', methods=['GET', 'POST'])
+@login_required
+@requires_role('Manager')
+def import_shifts_upload():
+    form = ImportShiftsForm()
+    if form.validate_on_submit():
+        upload = form.file.data
+        fmt = format_for_filename(upload.filename)
+        filename = f'import-{uuid.uuid4().hex}.{fmt}'
+        upload.save(os.path.join(job_files_dir(), filename))
+        job = enqueue('import_shifts', {'file': filename, 'format': fmt}, user_id=current_user.id)
+        db.session.commit()
+        flash('Import queued.')
+        return redirect(url_for('rota.job_status', job_id=job.id))
+    return render_template('import_shifts.html', title='Import shifts', form=form)
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256'
+SALT_LENGTH = 16
+# Calibrated iteration counts are rounded to this so hosts of similar speed
+# agree on the policy and don't keep rehashing each other's passwords.
+ITERATION_STEP = 10000
+
+
+def hash_method_params(pwhash):
+    """(algorithm, iterations) a stored werkzeug hash was made with; iterations is None if it has none."""
+    method = pwhash.split('$', 1)[0]
+    if not method.startswith('pbkdf2:'):
+        return method, None
+    args = method.split(':')
+    return args[1], int(args[2]) if len(args) > 2 else DEFAULT_PBKDF2_ITERATIONS
+
+
+def time_pbkdf2(algorithm, iterations, samples=3):
+    """Best-of-`samples` milliseconds for one PBKDF2 hash on this host."""
+    salt, password = os.urandom(SALT_LENGTH), b'calibration-password'
+    best = None
+    for _ in range(samples):
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac(algorithm, password, salt, iterations)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate_iterations(algorithm, target_ms, probe_iterations=100000):
+    """PBKDF2 iterations that take about `target_ms` here, rounded to ITERATION_STEP."""
+    per_iteration = time_pbkdf2(algorithm, probe_iterations) / probe_iterations
+    return max(ITERATION_STEP, round(target_ms / per_iteration / ITERATION_STEP) * ITERATION_STEP)
+
+
+class PasswordPolicy(object):
+    """One app's password hashing policy, built from its config.
+
+    PASSWORD_HASH_METHOD names a werkzeug PBKDF2 method ('pbkdf2:sha256').
+    PASSWORD_HASH_ITERATIONS fixes the work factor; without it,
+    PASSWORD_HASH_TARGET_MS calibrates one on first use, and without either
+    werkzeug's default applies. Hashes made under another policy are
+    reported by `needs_rehash` so they can be upgraded at the next login.
+
+    Hashing runs on a pool of PASSWORD_HASH_THREADS threads (0 hashes
+    inline). PBKDF2 releases the GIL, so a login burst is capped at that many
+    hashes at once instead of taking every worker thread, and under gevent
+    the hash runs off the event loop.
+    """
+
+    def __init__(self, config):
+        method = config.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD
+        if not method.startswith('pbkdf2:'):
+            raise ValueError(f'unsupported PASSWORD_HASH_METHOD {method!r}')
+        self.algorithm = method.split(':')[1]
+        self._iterations = config.get('PASSWORD_HASH_ITERATIONS')
+        self.target_ms = config.get('PASSWORD_HASH_TARGET_MS')
+        threads = config.get('PASSWORD_HASH_THREADS', 0)
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix='password-hash') if threads else None
+        self._dummy_hash = None
+
+    @property
+    def iterations(self):
+        if self._iterations is None:
+            if self.target_ms:
+                self._iterations = calibrate_iterations(self.algorithm, self.target_ms)
+            else:
+                self._iterations = DEFAULT_PBKDF2_ITERATIONS
+        return self._iterations
+
+    @property
+    def method(self):
+        return f'pbkdf2:{self.algorithm}:{self.iterations}'
+
+    def _run(self, fn, *args):
+        gevent_hub = _gevent_hub()
+        if gevent_hub is not None:
+            return gevent_hub.threadpool.apply(fn, args)
+        if self._executor is None:
+            return fn(*args)
+        return self._executor.submit(fn, *args).result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, SALT_LENGTH)
+
+    def verify(self, pwhash, password):
+        """Check `password` against `pwhash`.
+
+        A missing hash (unknown user) is checked against a throwaway one, so
+        it takes as long as a wrong password and doesn't reveal the username.
+        """
+        if not pwhash:
+            if self._dummy_hash is None:
+                self._dummy_hash = generate_password_hash(os.urandom(16).hex(), self.method, SALT_LENGTH)
+            self._run(check_password_hash, self._dummy_hash, password)
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return hash_method_params(pwhash) != (self.algorithm, self.iterations)
+
+
+class PasswordHasher(object):
+    """Extension giving each app a PasswordPolicy; calls go to current_app's."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['password_hasher'] = PasswordPolicy(app.config)
+
+    @property
+    def policy(self):
+        return current_app.extensions['password_hasher']
+
+    @property
+    def algorithm(self):
+        return self.policy.algorithm
+
+    @property
+    def iterations(self):
+        return self.policy.iterations
+
+    @property
+    def method(self):
+        return self.policy.method
+
+    def hash(self, password):
+        return self.policy.hash(password)
+
+    def verify(self, pwhash, password):
+        return self.policy.verify(pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return self.policy.needs_rehash(pwhash)
+
+
+def _gevent_hub():
+    """The gevent hub when threads are monkey-patched, as under the gevent worker."""
+    if 'gevent' not in sys.modules:
+        return None
+    from gevent import monkey, get_hub
+    return get_hub() if monkey.is_module_patched('threading') else None
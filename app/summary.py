@@ -0,0 +1,79 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from app import db
+from app.models import Business, LabourCostSummary
+from app.archive import shift_source
+
+
+def _day_bounds(since, until):
+    """Inclusive first and last day of a slice from optional dates or datetimes."""
+    first = since.date() if isinstance(since, datetime) else since
+    last = until.date() if isinstance(until, datetime) else until
+    return first, last
+
+
+def refresh_summary(employee_ids=None, business_ids=None, since=None, until=None):
+    """Recompute the labour cost rollup for one slice of shifts.
+
+    The slice is every shift matching the given employees, businesses and
+    start days (all optional; no arguments rebuilds everything). Its summary
+    rows are deleted and re-aggregated from `shift`, and from `shift_archive`
+    when the slice reaches into it, with one INSERT ... SELECT.
+    Nothing is committed, so callers can refresh in the same transaction as
+    the write that changed the shifts or wages.
+    """
+    db.session.flush()
+    first, last = _day_bounds(since, until)
+    shift = shift_source(first)
+    shift_day = func.date(shift.start_time)
+
+    stale = delete(LabourCostSummary)
+    source = select(shift.business_id, shift.employee_id, shift_day,
+                    func.sum(shift.shift_length), func.sum(shift.shift_cost), func.count(shift.id))
+    if employee_ids is not None:
+        employee_ids = list(employee_ids)
+        stale = stale.where(LabourCostSummary.employee_id.in_(employee_ids))
+        source = source.where(shift.employee_id.in_(employee_ids))
+    if business_ids is not None:
+        business_ids = list(business_ids)
+        stale = stale.where(LabourCostSummary.business_id.in_(business_ids))
+        source = source.where(shift.business_id.in_(business_ids))
+    if first is not None:
+        stale = stale.where(LabourCostSummary.day >= first)
+        source = source.where(shift.start_time >= datetime.combine(first, time.min))
+    if last is not None:
+        stale = stale.where(LabourCostSummary.day <= last)
+        source = source.where(shift.start_time < datetime.combine(last + timedelta(days=1), time.min))
+    source = source.group_by(shift.business_id, shift.employee_id, shift_day)
+
+    db.session.execute(stale, execution_options={'synchronize_session': False})
+    db.session.execute(insert(LabourCostSummary).from_select(
+        ['business_id', 'employee_id', 'day', 'hours', 'cost', 'shift_count'], source))
+
+
+def period_bounds(period, today=None):
+    """First and last day of the current 'week' (Monday to Sunday) or 'month'."""
+    today = today or date.today()
+    if period == 'week':
+        first = today - timedelta(days=today.weekday())
+        return first, first + timedelta(days=6)
+    if period == 'month':
+        first = today.replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        return first, next_month - timedelta(days=1)
+    raise ValueError(f'unknown period {period!r}')
+
+
+def business_costs(first, last):
+    """Hours, cost and shift count per business between two days (inclusive), from the rollup."""
+    return db.session.query(Business.id, Business.name,
+                            func.sum(LabourCostSummary.hours),
+                            func.sum(LabourCostSummary.cost),
+                            func.sum(LabourCostSummary.shift_count)) \
+        .join(LabourCostSummary, LabourCostSummary.business_id == Business.id) \
+        .filter(LabourCostSummary.day >= first, LabourCostSummary.day <= last) \
+        .group_by(Business.id, Business.name) \
+        .order_by(Business.name) \
+        .all()
@@ -0,0 +1,117 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+from flask_login import current_user
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db, cache
+from app.models import DataVersion
+
+GLOBAL_SCOPE = 'global'
+WAGES_SCOPE = 'wages'
+# Last-Modified for scopes that have never been written to.
+EPOCH = datetime(1970, 1, 1)
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def employee_scope(employee_id):
+    return f'employee:{employee_id}'
+
+
+def business_scope(business_id):
+    return f'business:{business_id}'
+
+
+def shift_scopes(employee_ids=(), business_ids=()):
+    """Scopes a change to shifts of these employees and businesses invalidates."""
+    return [GLOBAL_SCOPE] + [employee_scope(id) for id in employee_ids] + \
+        [business_scope(id) for id in business_ids]
+
+
+def bump(*scopes):
+    """Increment each scope's version in the current transaction; nothing is committed.
+
+    Scopes are written in sorted order so concurrent writers lock the rows
+    in the same order.
+    """
+    now = datetime.utcnow()
+    scopes = sorted(set(scopes))
+    table = DataVersion.__table__
+    insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    if insert is not None:
+        statement = insert(table).values([{'scope': scope, 'version': 1, 'updated_at': now} for scope in scopes])
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.scope], set_={'version': table.c.version + 1, 'updated_at': now}))
+        return
+    db.session.execute(update(table).where(table.c.scope.in_(scopes))
+                       .values(version=table.c.version + 1, updated_at=now))
+    existing = set(db.session.execute(select(table.c.scope).where(table.c.scope.in_(scopes))).scalars())
+    missing = [{'scope': scope, 'version': 1, 'updated_at': now} for scope in scopes if scope not in existing]
+    if missing:
+        db.session.execute(table.insert(), missing)
+
+
+def version_stamp(scopes):
+    """(token, last_modified) for the scopes from one query; the token changes whenever any of them is bumped."""
+    rows = db.session.execute(select(DataVersion.scope, DataVersion.version, DataVersion.updated_at)
+                              .where(DataVersion.scope.in_(list(scopes)))).all()
+    versions = {scope: (version, updated_at) for scope, version, updated_at in rows}
+    token = ';'.join(f'{scope}={versions.get(scope, (0, None))[0]}' for scope in sorted(set(scopes)))
+    last_modified = max((updated_at for _, updated_at in versions.values()), default=EPOCH)
+    return token, last_modified
+
+
+def _digest(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:24]
+
+
+def conditional(scopes):
+    """Answer GETs with 304 Not Modified until one of the view's data scopes changes.
+
+    `scopes()` names the scopes the response depends on, usually from
+    `request.view_args` or `request.args`. The version lookup is the only
+    query an unchanged page costs. The ETag also covers the user, since
+    pages show the signed in user, and RELEASE_VERSION, since a deploy can
+    change how the same data renders. The view can read the data version as
+    `g.data_version`, e.g. for `cached_fragment`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped_view(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            token, last_modified = version_stamp(scopes())
+            g.data_version = token
+            etag = _digest(token, current_user.get_id(), current_app.config['RELEASE_VERSION'])
+            last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+            response = current_app.response_class(status=304) if not_modified \
+                else make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Browsers may keep a copy but must check back with the ETag every time.
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapped_view
+    return decorator
+
+
+def cached_fragment(name, render):
+    """Output of `render()`, cached under `name` and the request's data version.
+
+    Needs @conditional on the view. Keys change when the data does, so
+    entries are never invalidated, only left to expire after
+    FRAGMENT_CACHE_TTL.
+    """
+    key = f'fragment:{_digest(name, g.data_version, current_app.config["RELEASE_VERSION"])}'
+    return cache.get_or_set(key, render, ttl=current_app.config['FRAGMENT_CACHE_TTL'])
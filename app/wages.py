@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Employee, Wage
+from app.summary import refresh_summary
+from app.jobs import enqueue
+from app.versions import GLOBAL_SCOPE, WAGES_SCOPE, bump, employee_scope
+
+# A current-wage change that loses a race with another one on the partial
+# unique index (uq_wage_current_employee_id) is retried this many times in all.
+WAGE_WRITE_ATTEMPTS = 3
+
+
+def add_employee(firstname, lastname, hourly_rate):
+    """Add an employee with a current wage starting now.
+
+    Flushes for the employee id, so an employee with the same name that
+    another request committed raises IntegrityError here; nothing is committed.
+    """
+    employee = Employee(firstname=firstname, lastname=lastname)
+    db.session.add(employee)
+    db.session.flush()
+    db.session.add(Wage(employee_id=employee.id, hourly_rate=hourly_rate, valid_from=datetime.now(),
+                        is_current=True))
+    bump(GLOBAL_SCOPE, WAGES_SCOPE, employee_scope(employee.id))
+    return employee
+
+
+def add_wage(employee_id, hourly_rate, valid_from, valid_to=None, is_current=False, background=False,
+             user_id=None):
+    """Add a wage and refresh the employee's labour cost rollup; nothing is committed.
+
+    A new current wage demotes the old one with a single UPDATE, so there is
+    no moment, even inside the transaction, where the employee has two.
+    With `background` the rollup refresh, which can reprice years of shifts,
+    is queued as a job in the same transaction instead, owned by `user_id`
+    so that user can follow it on the job page.
+    """
+    demoted = False
+    if is_current:
+        result = db.session.execute(
+            update(Wage).where(Wage.employee_id == employee_id, Wage.is_current).values(is_current=False),
+            execution_options={'synchronize_session': False})
+        demoted = result.rowcount > 0
+    wage = Wage(employee_id=employee_id, hourly_rate=hourly_rate, valid_from=valid_from, valid_to=valid_to,
+                is_current=is_current)
+    db.session.add(wage)
+    # Demoting the old current wage can re-price the employee's whole history.
+    since = None if demoted else valid_from
+    if background:
+        enqueue('refresh_summary', {'employee_ids': [employee_id], 'since': since.isoformat() if since else None},
+                user_id=user_id)
+    else:
+        refresh_summary(employee_ids=[employee_id], since=since)
+    bump(GLOBAL_SCOPE, WAGES_SCOPE, employee_scope(employee_id))
+    return wage
+
+
+def commit_wage_change(change, attempts=WAGE_WRITE_ATTEMPTS):
+    """Run `change()` and commit it as one transaction, retrying on IntegrityError.
+
+    Two requests making a new current wage for the same employee can both
+    demote the old one before either commits; the unique index then rejects
+    the later commit, and re-running it demotes the wage that won instead.
+    """
+    for attempt in range(attempts):
+        try:
+            result = change()
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+        else:
+            return result
@@ -0,0 +1,4 @@
+"""Synthetic data and latency/query/memory benchmarks for the rota views.
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
@@ -0,0 +1,151 @@
+"""Generate benchmark data and benchmark the rota views.
+
+    python -m benchmarks generate --reset --shifts 50000
+    python -m benchmarks run --output baseline.json
+    python -m benchmarks run --baseline baseline.json
+    python -m benchmarks load --readers 8 --writers 2
+    python -m benchmarks serve --worker-class sync --worker-class gthread
+    python -m benchmarks startup --runs 10
+    python -m benchmarks wage-race --writers 8 --rounds 10
+"""
+import argparse
+import os
+import sys
+
+DEFAULT_DATABASE = 'sqlite:///bench.db'
+
+
+def _app(database):
+    # Config reads its database URL at import time.
+    os.environ['DATABASE_URL'] = database
+    from app import create_app, db
+    return create_app(), db
+
+
+def generate_command(args):
+    from benchmarks.generate import generate
+    app, db = _app(args.database)
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        generate(db, businesses=args.businesses, employees=args.employees, shifts=args.shifts, seed=args.seed)
+    print(f'Generated {args.businesses} businesses, {args.employees} employees and {args.shifts} shifts '
+          f'in {args.database}')
+
+
+def run_command(args):
+    from benchmarks import harness
+    app, db = _app(args.database)
+    report = harness.run_benchmarks(app, db, iterations=args.iterations, warmup=args.warmup,
+                                    scenarios=args.scenario)
+    for name, result in report['results'].items():
+        print(f'{name:32} p50 {result["p50_ms"]:8.2f}ms  p90 {result["p90_ms"]:8.2f}ms  '
+              f'p99 {result["p99_ms"]:8.2f}ms  {result["queries"]:3d} queries  {result["peak_kib"]:9.1f} KiB')
+    if args.output:
+        harness.save(report, args.output)
+    if args.baseline:
+        regressions = harness.compare(report, harness.load(args.baseline), tolerance=args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+def load_command(args):
+    from benchmarks.load import run_load
+    app, db = _app(args.database)
+    results = run_load(app, readers=args.readers, writers=args.writers, seconds=args.seconds)
+    for kind, result in results.items():
+        print(f'{kind:5}  {result["requests_per_second"]:8.1f} req/s  '
+              f'{result["ok"]:6d} ok  {result["failed"]:4d} failed')
+    return 1 if any(result['failed'] for result in results.values()) else 0
+
+
+def serve_command(args):
+    from benchmarks.serving import WORKER_MODELS, measure_worker_model
+    for worker_class in args.worker_class or WORKER_MODELS:
+        result = measure_worker_model(worker_class, args.database, concurrency=args.concurrency,
+                                      seconds=args.seconds, port=args.port)
+        print(f'{worker_class:8} {result["requests_per_second"]:8.1f} req/s  '
+              f'{result["ok"]:6d} ok  {result["failed"]:4d} failed')
+    return 0
+
+
+def startup_command(args):
+    from benchmarks.startup import measure_startup
+    result = measure_startup(args.database, runs=args.runs)
+    print(f'import {result["import_ms"]:8.1f}ms  create_app {result["create_app_ms"]:8.1f}ms  '
+          f'first request {result["first_request_ms"]:8.1f}ms  total {result["total_ms"]:8.1f}ms')
+    if result['migrate_loaded']:
+        print('flask_migrate was imported outside the CLI', file=sys.stderr)
+        return 1
+    return 0
+
+
+def wage_race_command(args):
+    from benchmarks.wage_race import run_wage_race
+    app, db = _app(args.database)
+    result = run_wage_race(app, db, employee_id=args.employee, writers=args.writers, rounds=args.rounds)
+    print(f'{result["committed"]} committed, {result["failed"]} failed, '
+          f'at most {result["most_current"]} current wage(s)')
+    return 0 if result['most_current'] <= 1 else 1
+
+
+def main(argv=None):
+    from benchmarks.harness import DEFAULT_TOLERANCE
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=os.environ.get('BENCH_DATABASE_URL', DEFAULT_DATABASE),
+                        help='SQLAlchemy URL of the benchmark database (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help='fill the benchmark database with synthetic data')
+    gen.add_argument('--businesses', type=int, default=10)
+    gen.add_argument('--employees', type=int, default=200)
+    gen.add_argument('--shifts', type=int, default=20000)
+    gen.add_argument('--seed', type=int, default=1)
+    gen.add_argument('--reset', action='store_true', help='drop all tables first')
+    gen.set_defaults(func=generate_command)
+
+    run = commands.add_parser('run', help='measure the views and optionally compare against a baseline')
+    run.add_argument('--iterations', type=int, default=50)
+    run.add_argument('--warmup', type=int, default=5)
+    run.add_argument('--scenario', action='append', help='only run this scenario (repeatable)')
+    run.add_argument('--output', help='write the results to this JSON file (e.g. to record a baseline)')
+    run.add_argument('--baseline', help='JSON results to compare against; exits 1 on regression')
+    run.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                     help='allowed relative latency growth (default: %(default)s)')
+    run.set_defaults(func=run_command)
+
+    load = commands.add_parser('load', help='measure throughput with concurrent readers and writers')
+    load.add_argument('--readers', type=int, default=4)
+    load.add_argument('--writers', type=int, default=2)
+    load.add_argument('--seconds', type=float, default=10)
+    load.set_defaults(func=load_command)
+
+    serve = commands.add_parser('serve', help='compare gunicorn worker models on the list views over HTTP')
+    serve.add_argument('--worker-class', action='append', help='sync, gthread or gevent (repeatable; default all)')
+    serve.add_argument('--concurrency', type=int, default=8, help='concurrent keep-alive clients')
+    serve.add_argument('--seconds', type=float, default=10)
+    serve.add_argument('--port', type=int, default=5099)
+    serve.set_defaults(func=serve_command)
+
+    startup = commands.add_parser('startup', help='measure cold start: import, create_app and first request')
+    startup.add_argument('--runs', type=int, default=5)
+    startup.set_defaults(func=startup_command)
+
+    race = commands.add_parser('wage-race', help='check concurrent current-wage changes leave one current wage')
+    race.add_argument('--employee', type=int, default=1)
+    race.add_argument('--writers', type=int, default=8)
+    race.add_argument('--rounds', type=int, default=10)
+    race.set_defaults(func=wage_race_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
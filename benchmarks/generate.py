@@ -0,0 +1,65 @@
+import random
+from datetime import datetime, timedelta
+
+BENCH_USERNAME = 'bench'
+BENCH_PASSWORD = 'bench'
+INSERT_CHUNK_SIZE = 5000
+
+
+def generate(db, businesses=5, employees=50, shifts=10000, seed=1, start=datetime(2022, 1, 1), days=365):
+    """Fill an empty schema with a reproducible rota.
+
+    Creates the Admin and Manager roles, a Manager login (bench/bench),
+    `businesses` businesses, `employees` employees with one to four
+    back-to-back wages each (the last one current) and `shifts` shifts of
+    4-10 hours spread over `days` days from `start`. The same seed always
+    produces the same data.
+    """
+    from app.models import Business, Employee, Role, Shift, User, Wage
+    from app.summary import refresh_summary
+
+    rnd = random.Random(seed)
+
+    manager = Role(name='Manager')
+    db.session.add_all([Role(name='Admin'), manager])
+    user = User(username=BENCH_USERNAME, email='bench@example.com')
+    user.set_password(BENCH_PASSWORD)
+    user.roles.append(manager)
+    db.session.add(user)
+
+    # Added as objects so the database hands out the ids (and advances
+    # PostgreSQL's sequences); there are only a few of them.
+    business_rows = [Business(name=f'Business {i}') for i in range(1, businesses + 1)]
+    employee_rows = [Employee(firstname=f'First{i}', lastname=f'Last{i}') for i in range(1, employees + 1)]
+    db.session.add_all(business_rows + employee_rows)
+    db.session.flush()
+    business_ids = [business.id for business in business_rows]
+    employee_ids = [employee.id for employee in employee_rows]
+
+    wages = []
+    for employee_id in employee_ids:
+        changes = sorted(rnd.sample(range(1, days), rnd.randint(0, 3)))
+        valid_from = start - timedelta(days=30)
+        rate = round(rnd.uniform(10.5, 14), 2)
+        for change in changes:
+            valid_to = start + timedelta(days=change)
+            wages.append({'employee_id': employee_id, 'hourly_rate': rate, 'valid_from': valid_from,
+                          'valid_to': valid_to, 'is_current': False})
+            valid_from, rate = valid_to, round(rate + rnd.uniform(0.1, 1.5), 2)
+        wages.append({'employee_id': employee_id, 'hourly_rate': rate, 'valid_from': valid_from,
+                      'valid_to': None, 'is_current': True})
+    db.session.bulk_insert_mappings(Wage, wages)
+
+    chunk = []
+    for _ in range(shifts):
+        start_time = start + timedelta(days=rnd.randrange(days), hours=rnd.randint(5, 14))
+        chunk.append({'employee_id': rnd.choice(employee_ids), 'business_id': rnd.choice(business_ids),
+                      'start_time': start_time, 'finish_time': start_time + timedelta(hours=rnd.randint(4, 10))})
+        if len(chunk) >= INSERT_CHUNK_SIZE:
+            db.session.bulk_insert_mappings(Shift, chunk)
+            chunk = []
+    if chunk:
+        db.session.bulk_insert_mappings(Shift, chunk)
+
+    refresh_summary()
+    db.session.commit()
@@ -0,0 +1,173 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select
+
+from benchmarks.generate import BENCH_PASSWORD, BENCH_USERNAME
+
+# Regressions are flagged when a latency percentile grows by more than this
+# fraction over the baseline, or the query count grows at all.
+DEFAULT_TOLERANCE = 0.25
+COMPARED_LATENCIES = ('p50_ms', 'p90_ms')
+
+
+def next_free_start(db, employee_id, earliest=datetime(2030, 1, 1)):
+    """First whole day after the employee's last shift, so new bookings never overlap."""
+    from app.models import Shift
+    with db.engine.connect() as conn:
+        last = conn.execute(select(func.max(Shift.finish_time)).where(Shift.employee_id == employee_id)).scalar()
+    if last is None or last < earliest:
+        return earliest
+    return datetime.combine(last.date() + timedelta(days=1), datetime.min.time())
+
+
+# Set by run_benchmarks; the benchmarked bookings for employee 1 start here.
+_booking_start = datetime(2030, 1, 1)
+
+
+def _new_shift_form(i):
+    start = _booking_start + timedelta(hours=12 * i)
+    return {'employee_id': '1', 'business_id': '1',
+            'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+            'finish_time': (start + timedelta(hours=8)).strftime('%Y-%m-%dT%H:%M')}
+
+
+# (name, method, path, form data factory or None)
+SCENARIOS = [
+    ('list_shifts', 'GET', '/list_shifts', None),
+    ('list_shifts_data', 'GET', '/api/shifts', None),
+    ('list_shifts_data_sorted_search', 'GET', '/api/shifts?sort=-cost&search=Business 1', None),
+    ('employee', 'GET', '/employee/1', None),
+    ('employee_data', 'GET', '/api/shifts?employee_id=1', None),
+    ('business', 'GET', '/business/1', None),
+    ('business_data', 'GET', '/api/shifts?business_id=1', None),
+    ('shifts_table_business', 'GET', '/shifts/table?business_id=1', None),
+    ('shifts_table', 'GET', '/shifts/table', None),
+    ('new_shift_form', 'GET', '/new_shift', None),
+    ('new_shift_submit', 'POST', '/new_shift', _new_shift_form),
+    ('login', 'POST', '/login', lambda i: {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD}),
+]
+
+
+class QueryCounter(object):
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    def _before_cursor_execute(self, *args):
+        self.count += 1
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _login(app):
+    client = app.test_client()
+    client.post('/login', data={'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+    return client
+
+
+def _request(app, client, method, path, data_factory, i):
+    if path == '/login':
+        # a fresh, anonymous client each time so the password is actually checked
+        client = app.test_client()
+    data = data_factory(i) if data_factory else None
+    response = client.open(path, method=method, data=data)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method} {path} returned {response.status_code}')
+    # Read streamed bodies through, without keeping them, as a client would.
+    for _ in response.iter_encoded():
+        pass
+    response.close()
+    return response
+
+
+def run_benchmarks(app, db, iterations=50, warmup=5, scenarios=None):
+    """Drive each scenario through the test client and summarise it.
+
+    Latency is measured with tracing off; a separate pass under tracemalloc
+    records the peak Python memory allocated by a single request.
+    """
+    global _booking_start
+    scenarios = [s for s in SCENARIOS if not scenarios or s[0] in scenarios]
+    app.config['WTF_CSRF_ENABLED'] = False
+    results = {}
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        dialect = db.engine.dialect.name
+        _booking_start = next_free_start(db, 1)
+    client = _login(app)
+
+    for name, method, path, data_factory in scenarios:
+        for i in range(warmup):
+            _request(app, client, method, path, data_factory, i)
+
+        timings, queries = [], []
+        for i in range(warmup, warmup + iterations):
+            counter.count = 0
+            started = time.perf_counter()
+            _request(app, client, method, path, data_factory, i)
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count)
+
+        tracemalloc.start()
+        peak = 0
+        for i in range(warmup + iterations, warmup + iterations + min(iterations, 5)):
+            tracemalloc.reset_peak()
+            _request(app, client, method, path, data_factory, i)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        results[name] = {
+            'requests': iterations,
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p90_ms': round(percentile(timings, 0.90), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': max(queries),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    return {
+        'meta': {
+            'created': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': dialect,
+            'iterations': iterations,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Human readable regressions of `current` against `baseline` (empty if none)."""
+    regressions = []
+    for name, base in baseline['results'].items():
+        result = current['results'].get(name)
+        if result is None:
+            continue
+        for key in COMPARED_LATENCIES:
+            if result[key] > base[key] * (1 + tolerance):
+                regressions.append(f'{name}: {key} {result[key]:.2f} > {base[key]:.2f} (+{tolerance:.0%} allowed)')
+        if result['queries'] > base['queries']:
+            regressions.append(f'{name}: {result["queries"]} queries > {base["queries"]}')
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -0,0 +1,75 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.generate import BENCH_PASSWORD, BENCH_USERNAME
+from benchmarks.harness import next_free_start
+
+READ_PATHS = ('/api/shifts', '/api/shifts?business_id=1', '/api/shifts?employee_id=1&sort=-cost')
+
+
+def _reader(app, stop, stats, index):
+    client = app.test_client()
+    client.post('/login', data={'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+    n = 0
+    while not stop.is_set():
+        response = client.get(READ_PATHS[n % len(READ_PATHS)])
+        stats.record('read', response.status_code == 200)
+        n += 1
+
+
+def _writer(app, stop, stats, index):
+    from app import db
+    client = app.test_client()
+    client.post('/login', data={'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+    # each writer books its own employee after their last shift so shifts never clash
+    with app.app_context():
+        start = next_free_start(db, index + 1, earliest=datetime(2040, 1, 1))
+    n = 0
+    while not stop.is_set():
+        shift_start = start + timedelta(hours=12 * n)
+        response = client.post('/new_shift', data={
+            'employee_id': str(index + 1), 'business_id': '1',
+            'start_time': shift_start.strftime('%Y-%m-%dT%H:%M'),
+            'finish_time': (shift_start + timedelta(hours=8)).strftime('%Y-%m-%dT%H:%M')})
+        stats.record('write', response.status_code == 302)
+        n += 1
+
+
+class LoadStats(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ok = {'read': 0, 'write': 0}
+        self.failed = {'read': 0, 'write': 0}
+
+    def record(self, kind, ok):
+        with self._lock:
+            (self.ok if ok else self.failed)[kind] += 1
+
+
+def run_load(app, readers=4, writers=2, seconds=10):
+    """Hammer the shift API and new_shift from concurrent threads.
+
+    Returns requests per second and failures for readers and writers.
+    Failures are mostly "database is locked" errors surfacing as 500s, which
+    is what the SQLite WAL/busy_timeout settings are meant to prevent.
+    """
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    stats = LoadStats()
+    stop = threading.Event()
+    threads = [threading.Thread(target=_reader, args=(app, stop, stats, i)) for i in range(readers)]
+    threads += [threading.Thread(target=_writer, args=(app, stop, stats, i)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {kind: {'requests_per_second': round(stats.ok[kind] / elapsed, 1),
+                   'ok': stats.ok[kind], 'failed': stats.failed[kind]}
+            for kind in ('read', 'write')}
@@ -0,0 +1,90 @@
+import http.client
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from benchmarks.generate import BENCH_PASSWORD, BENCH_USERNAME
+
+WORKER_MODELS = ('sync', 'gthread', 'gevent')
+SERVING_PATHS = ('/list_shifts', '/api/shifts', '/api/shifts?employee_id=1', '/api/shifts?business_id=1')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/login')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'gunicorn did not start on port {port}')
+
+
+def _login(port):
+    """Session cookie for the bench user, going through the real CSRF-protected form."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/login')
+    response = conn.getresponse()
+    cookie = response.getheader('Set-Cookie', '').split(';')[0]
+    token = re.search(r'id="csrf_token" name="csrf_token" type="hidden" value="([^"]+)"', response.read().decode())
+    conn.request('POST', '/login', body=urlencode({
+        'csrf_token': token.group(1) if token else '', 'username': BENCH_USERNAME, 'password': BENCH_PASSWORD}),
+        headers={'Content-Type': 'application/x-www-form-urlencoded', 'Cookie': cookie})
+    response = conn.getresponse()
+    response.read()
+    if response.status != 302:
+        raise RuntimeError('could not log in as the benchmark user; run `python -m benchmarks generate` first')
+    return response.getheader('Set-Cookie').split(';')[0]
+
+
+def _client(port, cookie, stop, counts, index):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    n = index
+    while not stop.is_set():
+        try:
+            conn.request('GET', SERVING_PATHS[n % len(SERVING_PATHS)], headers={'Cookie': cookie})
+            response = conn.getresponse()
+            response.read()
+            counts[index][0 if response.status == 200 else 1] += 1
+        except (OSError, http.client.HTTPException):
+            counts[index][1] += 1
+            conn.close()
+        n += 1
+
+
+def measure_worker_model(worker_class, database, concurrency=8, seconds=10, port=5099):
+    """Requests per second for the list views under one gunicorn worker model."""
+    env = dict(os.environ, DATABASE_URL=database, PORT=str(port), GUNICORN_WORKER_CLASS=worker_class)
+    # same as the `gunicorn` script, but tied to this interpreter
+    server = subprocess.Popen([sys.executable, '-c', 'from gunicorn.app.wsgiapp import run; run()',
+                               '-c', 'gunicorn.conf.py', 'main:app'],
+                              cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_until_up(port)
+        cookie = _login(port)
+        stop = threading.Event()
+        counts = [[0, 0] for _ in range(concurrency)]
+        clients = [threading.Thread(target=_client, args=(port, cookie, stop, counts, i))
+                   for i in range(concurrency)]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+        time.sleep(seconds)
+        stop.set()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    ok = sum(c[0] for c in counts)
+    return {'worker_class': worker_class, 'requests_per_second': round(ok / elapsed, 1),
+            'ok': ok, 'failed': sum(c[1] for c in counts)}
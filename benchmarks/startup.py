@@ -0,0 +1,42 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter per sample so nothing is already imported.
+_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+with application.test_client() as client:
+    status = client.get('/login').status_code
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'total_ms': (served - started) * 1000,
+    'status': status,
+    'migrate_loaded': 'flask_migrate' in sys.modules,
+}))
+'''
+
+
+def measure_startup(database, runs=5):
+    """Median cold-start timings of the web app (import, create_app, first request)."""
+    env = dict(os.environ, DATABASE_URL=database)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE], cwd=REPO_ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {key: round(statistics.median(s[key] for s in samples), 1)
+              for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms')}
+    result['migrate_loaded'] = any(s['migrate_loaded'] for s in samples)
+    return result
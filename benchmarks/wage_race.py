@@ -0,0 +1,51 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+
+def run_wage_race(app, db, employee_id=1, writers=8, rounds=10):
+    """Have `writers` threads keep giving one employee a new current wage at once.
+
+    Every write goes through app.wages, as the new_wage view does. Returns
+    the number of committed and failed writes and the highest number of
+    current wages the employee had when checked after each round (it must
+    never exceed 1).
+    """
+    from app.models import Wage
+    from app.wages import add_wage, commit_wage_change
+
+    counts = {'committed': 0, 'failed': 0}
+    lock = threading.Lock()
+    most_current = 0
+
+    def writer(index, barrier):
+        with app.app_context():
+            barrier.wait()
+            try:
+                commit_wage_change(lambda: add_wage(employee_id, hourly_rate=10 + index,
+                                                    valid_from=datetime.now() - timedelta(seconds=index),
+                                                    is_current=True))
+                outcome = 'committed'
+            except Exception:
+                db.session.rollback()
+                outcome = 'failed'
+            finally:
+                db.session.remove()
+        with lock:
+            counts[outcome] += 1
+
+    for _ in range(rounds):
+        barrier = threading.Barrier(writers)
+        threads = [threading.Thread(target=writer, args=(i, barrier)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with app.app_context():
+            current = db.session.query(func.count(Wage.id)) \
+                .filter(Wage.employee_id == employee_id, Wage.is_current).scalar()
+            db.session.remove()
+        most_current = max(most_current, current)
+
+    return dict(counts, most_current=most_current)
@@ -1,7 +1,22 @@
 import os
+import tempfile
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
+def engine_options(uri):
+    """Connection pool settings for server databases; SQLite manages its own connections."""
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE') or 5),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 10),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT') or 30),
+        # recycle before typical server/proxy idle timeouts drop the connection
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE') or 1800),
+        'pool_pre_ping': True,
+    }
+
+
 class Config(object):
 
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
@@ -9,4 +24,72 @@ class Config(object):
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+
+    # Applied to every new SQLite connection. WAL lets readers run alongside a
+    # writer and busy_timeout makes a blocked writer wait instead of failing.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000),
+    }
+
+    # Optional read-only replica; views marked @read_replica send their SELECTs there.
+    SQLALCHEMY_READ_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': {'url': SQLALCHEMY_READ_REPLICA_URI,
+                                    **engine_options(SQLALCHEMY_READ_REPLICA_URI)}} \
+        if SQLALCHEMY_READ_REPLICA_URI else {}
+
+    # Set to a redis:// URL to share cached values between workers (needs the
+    # `redis` package); otherwise each process keeps its own cache.
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX') or 'seven:'
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL') or 300)
+    CHOICES_CACHE_TTL = int(os.environ.get('CHOICES_CACHE_TTL') or 300)
+    # Select fields with more options than this render only the selected one
+    # and are filled in by the typeahead instead.
+    CHOICES_INLINE_LIMIT = int(os.environ.get('CHOICES_INLINE_LIMIT') or 200)
+    USER_ROLES_CACHE_TTL = int(os.environ.get('USER_ROLES_CACHE_TTL') or 60)
+
+    # Identifies the deployed code in ETags and fragment cache keys, so a deploy
+    # doesn't serve pages rendered by the old templates.
+    RELEASE_VERSION = os.environ.get('RELEASE_VERSION') or os.environ.get('HEROKU_RELEASE_VERSION') or ''
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL') or 600)
+
+    # Background jobs (app.jobs), run by `flask worker`.
+    JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES') or 2)
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS') or 2)
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 3)
+    # First retry waits this long, doubling for each further attempt.
+    JOB_RETRY_BACKOFF_SECONDS = int(os.environ.get('JOB_RETRY_BACKOFF_SECONDS') or 30)
+    # A running job not finished after this long is assumed lost with its worker and retried.
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS') or 30 * 60)
+    JOB_FILES_DIR = os.environ.get('JOB_FILES_DIR') or os.path.join(basedir, 'jobs')
+
+    # Compiled templates are cached here so new workers skip compiling them;
+    # set to an empty string to turn the cache off.
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR',
+                                              os.path.join(tempfile.gettempdir(), 'seven-jinja-cache'))
+
+    # Vendored third-party assets (app.assets). `flask assets build` writes the
+    # fingerprinted, precompressed copies to ASSETS_DIST_DIR; served from /assets/.
+    ASSETS_VENDOR_DIR = os.path.join(basedir, 'app', 'static', 'vendor')
+    ASSETS_DIST_DIR = os.environ.get('ASSETS_DIST_DIR') or os.path.join(basedir, 'app', 'static', 'dist')
+    ASSETS_MAX_AGE = 365 * 24 * 3600
+
+    # Per-request SQL/template timing (Server-Timing header, log line, /_debug/requests).
+    PROFILING_ENABLED = os.environ.get('PROFILING', '').lower() in ('1', 'true', 'yes')
+    PROFILING_HISTORY = int(os.environ.get('PROFILING_HISTORY') or 200)
+    PROFILING_SLOW_QUERIES = 5
+    PROFILING_REQUEST_BUDGET_MS = float(os.environ.get('PROFILING_REQUEST_BUDGET_MS') or 500)
+    PROFILING_QUERY_BUDGET = int(os.environ.get('PROFILING_QUERY_BUDGET') or 20)
+
+    # Password hashing policy. Hashes made under other settings are upgraded at
+    # the next successful login. Run `flask auth calibrate` to pick iterations
+    # for this host; PASSWORD_HASH_TARGET_MS calibrates on first use instead.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256'
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS') or 0) or None
+    PASSWORD_HASH_TARGET_MS = float(os.environ.get('PASSWORD_HASH_TARGET_MS') or 0) or None
+    PASSWORD_HASH_THREADS = int(os.environ.get('PASSWORD_HASH_THREADS') or 2)
 
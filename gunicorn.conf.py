@@ -0,0 +1,63 @@
+"""Gunicorn settings, used by the Procfile: ``gunicorn -c gunicorn.conf.py main:app``.
+
+GUNICORN_WORKER_CLASS picks the worker model:
+
+- ``gthread`` (default): CPUs + 1 processes with GUNICORN_THREADS threads each.
+  Requests mostly wait on the database, so threads overlap that wait cheaply.
+- ``sync``: 2 * CPUs + 1 single-threaded processes.
+- ``gevent``: one process per CPU with cooperative greenlets (needs the
+  ``gevent`` package, and ``psycogreen`` for PostgreSQL).
+
+WEB_CONCURRENCY overrides the process count. The app is loaded once in the
+master and forked (preload_app), so workers start fast and share its memory.
+See the Serving section of the README for measured throughput of each model.
+"""
+import multiprocessing
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before the app (and its database driver) is imported by preload_app.
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+
+cpus = multiprocessing.cpu_count()
+if worker_class == 'sync':
+    default_workers = cpus * 2 + 1
+elif worker_class == 'gevent':
+    default_workers = cpus
+else:
+    default_workers = cpus + 1
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or default_workers)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS') or 1000)
+
+preload_app = True
+# Recycle workers now and then to bound slow leaks; the jitter stops them all
+# restarting at once.
+max_requests = 1000
+max_requests_jitter = 100
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Connections must never be shared across processes; drop any the master
+    # opened while preloading so each worker builds its own pool.
+    from app import db
+    from main import app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
@@ -1,4 +1,8 @@
-from app import app
+import os
+
+from app import create_app
+
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True, port=os.getenv("PORT", default=5000))
\ No newline at end of file
+    app.run(debug=True, port=int(os.getenv("PORT", default=5000)))
@@ -0,0 +1,63 @@
+"""shift and wage access path indexes
+
+Revision ID: 59b036731254
+Revises: c9c41a174866
+Create Date: 2026-10-17 10:02:17.530921
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '59b036731254'
+down_revision = 'c9c41a174866'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.env')
+
+
+def upgrade():
+    # Keep only the newest current wage per employee so the partial unique
+    # index can be built on existing data; each demotion is logged.
+    bind = op.get_bind()
+    wage = sa.table('wage', sa.column('id', sa.Integer), sa.column('employee_id', sa.Integer),
+                    sa.column('is_current', sa.Boolean))
+    newest_current = sa.select(sa.func.max(wage.c.id)).where(wage.c.is_current == sa.true()) \
+        .group_by(wage.c.employee_id)
+    stale = bind.execute(sa.select(wage.c.id, wage.c.employee_id)
+                         .where(wage.c.is_current == sa.true(), wage.c.id.notin_(newest_current))
+                         .order_by(wage.c.employee_id, wage.c.id)).all()
+    for wage_id, employee_id in stale:
+        logger.warning('Wage %s of employee %s is no longer current: the employee has a newer current wage.',
+                       wage_id, employee_id)
+    if stale:
+        op.execute(wage.update()
+                   .where(wage.c.id.in_([wage_id for wage_id, _ in stale]))
+                   .values(is_current=False))
+
+    with op.batch_alter_table('shift', schema=None) as batch_op:
+        batch_op.create_index('ix_shift_employee_id_start_time', ['employee_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_shift_business_id_start_time', ['business_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_shift_start_time', ['start_time'], unique=False)
+
+    with op.batch_alter_table('wage', schema=None) as batch_op:
+        batch_op.create_index('ix_wage_employee_id_validity',
+                              ['employee_id', 'valid_from', 'valid_to', 'is_current'], unique=False)
+        batch_op.create_index('uq_wage_current_employee_id', ['employee_id'], unique=True,
+                              sqlite_where=sa.text('is_current = 1'),
+                              postgresql_where=sa.text('is_current'))
+
+
+def downgrade():
+    with op.batch_alter_table('wage', schema=None) as batch_op:
+        batch_op.drop_index('uq_wage_current_employee_id')
+        batch_op.drop_index('ix_wage_employee_id_validity')
+
+    with op.batch_alter_table('shift', schema=None) as batch_op:
+        batch_op.drop_index('ix_shift_start_time')
+        batch_op.drop_index('ix_shift_business_id_start_time')
+        batch_op.drop_index('ix_shift_employee_id_start_time')
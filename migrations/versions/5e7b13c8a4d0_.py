@@ -0,0 +1,30 @@
+"""data version stamps
+
+Revision ID: 5e7b13c8a4d0
+Revises: d2a9c4e17b53
+Create Date: 2026-10-17 14:48:19.072655
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7b13c8a4d0'
+down_revision = 'd2a9c4e17b53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are created on the first write to each scope.
+    op.create_table('data_version',
+    sa.Column('scope', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('scope')
+    )
+
+
+def downgrade():
+    op.drop_table('data_version')
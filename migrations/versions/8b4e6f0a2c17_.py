@@ -0,0 +1,65 @@
+"""exclude overlapping shifts per employee on postgresql
+
+Revision ID: 8b4e6f0a2c17
+Revises: 3f1c2a7d9e84
+Create Date: 2026-10-17 13:20:44.903112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e6f0a2c17'
+down_revision = '3f1c2a7d9e84'
+branch_labels = None
+depends_on = None
+
+
+# Overlapping pairs listed when the upgrade is refused.
+REPORTED_OVERLAPS = 20
+
+
+def _check_no_overlaps(bind):
+    # Double bookings were never prevented before, and the constraint can't be
+    # added while any exist. Which shift of a pair is wrong is for a manager to
+    # decide, so list them and stop rather than deleting either one.
+    shift = sa.table('shift', sa.column('id', sa.Integer), sa.column('employee_id', sa.Integer),
+                     sa.column('start_time', sa.DateTime), sa.column('finish_time', sa.DateTime))
+    first, second = shift.alias('first'), shift.alias('second')
+    overlaps = bind.execute(
+        sa.select(first.c.employee_id, first.c.id, first.c.start_time, first.c.finish_time,
+                  second.c.id, second.c.start_time, second.c.finish_time)
+        .where(first.c.employee_id == second.c.employee_id,
+               first.c.id < second.c.id,
+               first.c.start_time < second.c.finish_time,
+               second.c.start_time < first.c.finish_time)
+        .order_by(first.c.employee_id, first.c.start_time)
+        .limit(REPORTED_OVERLAPS + 1)).all()
+    if not overlaps:
+        return
+    lines = [f'employee {employee_id}: shift {id} ({start} to {finish}) overlaps '
+             f'shift {other_id} ({other_start} to {other_finish})'
+             for employee_id, id, start, finish, other_id, other_start, other_finish
+             in overlaps[:REPORTED_OVERLAPS]]
+    if len(overlaps) > REPORTED_OVERLAPS:
+        lines.append('...')
+    raise RuntimeError('Existing shifts overlap, so the overlap constraint can\'t be added. '
+                       'Delete or correct these shifts, then upgrade again:\n' + '\n'.join(lines))
+
+
+def upgrade():
+    # Other databases rely on the application check in app.overlaps.
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    _check_no_overlaps(bind)
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute('ALTER TABLE shift ADD CONSTRAINT ex_shift_employee_id_overlap '
+               'EXCLUDE USING gist (employee_id WITH =, tsrange(start_time, finish_time) WITH &&)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('ALTER TABLE shift DROP CONSTRAINT ex_shift_employee_id_overlap')
@@ -0,0 +1,72 @@
+"""labour cost summary
+
+Revision ID: c9c41a174866
+Revises: 091023cfcbfd
+Create Date: 2026-10-17 09:12:40.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.costing import DEFAULT_HOURLY_RATE, hours_between, wage_covers_clause
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9c41a174866'
+down_revision = '091023cfcbfd'
+branch_labels = None
+depends_on = None
+
+
+def _backfill_summary():
+    # The same aggregation as app.summary.refresh_summary, against the tables
+    # as they are at this revision, so existing shifts show up straight away.
+    shift = sa.table('shift', sa.column('id', sa.Integer), sa.column('employee_id', sa.Integer),
+                     sa.column('business_id', sa.Integer), sa.column('start_time', sa.DateTime),
+                     sa.column('finish_time', sa.DateTime))
+    wage = sa.table('wage', sa.column('employee_id', sa.Integer), sa.column('hourly_rate', sa.Float),
+                    sa.column('valid_from', sa.DateTime), sa.column('valid_to', sa.DateTime),
+                    sa.column('is_current', sa.Boolean))
+    summary = sa.table('labour_cost_summary', sa.column('business_id', sa.Integer),
+                       sa.column('employee_id', sa.Integer), sa.column('day', sa.Date),
+                       sa.column('hours', sa.Float), sa.column('cost', sa.Float),
+                       sa.column('shift_count', sa.Integer))
+    rate = (sa.select(wage.c.hourly_rate)
+            .where(wage_covers_clause(wage.c, shift.c))
+            .order_by(wage.c.valid_from.desc())
+            .limit(1)
+            .correlate_except(wage)
+            .scalar_subquery())
+    hours = hours_between(shift.c.start_time, shift.c.finish_time)
+    shift_day = sa.func.date(shift.c.start_time)
+    source = sa.select(shift.c.business_id, shift.c.employee_id, shift_day, sa.func.sum(hours),
+                       sa.func.sum(hours * sa.func.coalesce(rate, DEFAULT_HOURLY_RATE)),
+                       sa.func.count(shift.c.id)) \
+        .group_by(shift.c.business_id, shift.c.employee_id, shift_day)
+    op.execute(summary.insert().from_select(
+        ['business_id', 'employee_id', 'day', 'hours', 'cost', 'shift_count'], source))
+
+
+def upgrade():
+    op.create_table('labour_cost_summary',
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('hours', sa.Float(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.Column('shift_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['business_id'], ['business.id'], ),
+    sa.ForeignKeyConstraint(['employee_id'], ['employee.id'], ),
+    sa.PrimaryKeyConstraint('business_id', 'employee_id', 'day')
+    )
+    with op.batch_alter_table('labour_cost_summary', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_labour_cost_summary_day'), ['day'], unique=False)
+
+    _backfill_summary()
+
+
+def downgrade():
+    with op.batch_alter_table('labour_cost_summary', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_labour_cost_summary_day'))
+
+    op.drop_table('labour_cost_summary')
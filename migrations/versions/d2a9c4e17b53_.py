@@ -0,0 +1,67 @@
+"""unique employee first and last name
+
+Revision ID: d2a9c4e17b53
+Revises: 8b4e6f0a2c17
+Create Date: 2026-10-17 14:05:32.611870
+
+"""
+import itertools
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a9c4e17b53'
+down_revision = '8b4e6f0a2c17'
+branch_labels = None
+depends_on = None
+
+
+logger = logging.getLogger('alembic.env')
+
+LASTNAME_LENGTH = 64
+
+
+def _rename_duplicate_employees(bind):
+    # NewEmployeeForm checked names before inserting, but two requests could
+    # both pass that check, so duplicates may exist. The oldest employee keeps
+    # the name; the others get ' (2)', ' (3)', ... on their last name, keeping
+    # their shifts and wages. Merging them is left to a manager.
+    employee = sa.table('employee', sa.column('id', sa.Integer), sa.column('firstname', sa.String),
+                        sa.column('lastname', sa.String))
+    duplicated = sa.select(employee.c.firstname, employee.c.lastname) \
+        .group_by(employee.c.firstname, employee.c.lastname) \
+        .having(sa.func.count() > 1).subquery()
+    rows = bind.execute(
+        sa.select(employee.c.id, employee.c.firstname, employee.c.lastname)
+        .join(duplicated, sa.and_(employee.c.firstname == duplicated.c.firstname,
+                                  employee.c.lastname == duplicated.c.lastname))
+        .order_by(employee.c.firstname, employee.c.lastname, employee.c.id)).all()
+    seen = set()
+    for id, firstname, lastname in rows:
+        if (firstname, lastname) not in seen:
+            seen.add((firstname, lastname))
+            continue
+        for n in itertools.count(2):
+            suffix = f' ({n})'
+            renamed = lastname[:LASTNAME_LENGTH - len(suffix)] + suffix
+            taken = bind.execute(sa.select(employee.c.id).where(employee.c.firstname == firstname,
+                                                                 employee.c.lastname == renamed)).first()
+            if taken is None:
+                break
+        bind.execute(employee.update().where(employee.c.id == id).values(lastname=renamed))
+        logger.warning('Employee %s renamed from "%s %s" to "%s %s": the name was already taken.',
+                       id, firstname, lastname, firstname, renamed)
+
+
+def upgrade():
+    _rename_duplicate_employees(op.get_bind())
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_employee_firstname_lastname', ['firstname', 'lastname'])
+
+
+def downgrade():
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_employee_firstname_lastname', type_='unique')
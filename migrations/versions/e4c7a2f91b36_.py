@@ -0,0 +1,98 @@
+"""shift archive table; partition shift by month on postgresql
+
+Revision ID: e4c7a2f91b36
+Revises: a71d3e95c2b8
+Create Date: 2026-10-17 23:05:12.618340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4c7a2f91b36'
+down_revision = 'a71d3e95c2b8'
+branch_labels = None
+depends_on = None
+
+SHIFT_COLUMNS = 'id, employee_id, business_id, start_time, finish_time'
+
+
+def _create_shift_indexes():
+    op.execute('CREATE INDEX ix_shift_employee_id_start_time ON shift (employee_id, start_time)')
+    op.execute('CREATE INDEX ix_shift_business_id_start_time ON shift (business_id, start_time)')
+    op.execute('CREATE INDEX ix_shift_start_time ON shift (start_time)')
+
+
+def upgrade():
+    op.create_table('shift_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('finish_time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['business_id'], ['business.id'], ),
+    sa.ForeignKeyConstraint(['employee_id'], ['employee.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('shift_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_shift_archive_employee_id_start_time', ['employee_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_shift_archive_business_id_start_time', ['business_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_shift_archive_start_time', ['start_time'], unique=False)
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # Rebuild shift as a table partitioned by start month. Every row starts in
+    # the default partition; `flask shifts partitions` then gives each month
+    # its own. The primary key has to include the partition key, and the
+    # overlap exclusion constraint can only exist per partition.
+    op.execute('ALTER TABLE shift RENAME TO shift_unpartitioned')
+    op.execute('ALTER TABLE shift_unpartitioned RENAME CONSTRAINT shift_pkey TO shift_unpartitioned_pkey')
+    op.execute('ALTER SEQUENCE shift_id_seq OWNED BY NONE')
+    op.execute("""
+        CREATE TABLE shift (
+            id integer NOT NULL DEFAULT nextval('shift_id_seq'),
+            employee_id integer NOT NULL REFERENCES employee (id),
+            business_id integer NOT NULL REFERENCES business (id),
+            start_time timestamp without time zone NOT NULL,
+            finish_time timestamp without time zone NOT NULL,
+            CONSTRAINT shift_pkey PRIMARY KEY (id, start_time)
+        ) PARTITION BY RANGE (start_time)""")
+    op.execute('ALTER SEQUENCE shift_id_seq OWNED BY shift.id')
+    op.execute('CREATE TABLE shift_default PARTITION OF shift DEFAULT')
+    op.execute('ALTER TABLE shift_default ADD CONSTRAINT ex_shift_default_employee_id_overlap '
+               'EXCLUDE USING gist (employee_id WITH =, tsrange(start_time, finish_time) WITH &&)')
+    op.execute(f'INSERT INTO shift ({SHIFT_COLUMNS}) SELECT {SHIFT_COLUMNS} FROM shift_unpartitioned')
+    op.execute('DROP TABLE shift_unpartitioned')
+    _create_shift_indexes()
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE shift RENAME TO shift_partitioned')
+        op.execute('ALTER TABLE shift_partitioned RENAME CONSTRAINT shift_pkey TO shift_partitioned_pkey')
+        op.execute('ALTER SEQUENCE shift_id_seq OWNED BY NONE')
+        op.execute("""
+            CREATE TABLE shift (
+                id integer NOT NULL DEFAULT nextval('shift_id_seq') PRIMARY KEY,
+                employee_id integer NOT NULL REFERENCES employee (id),
+                business_id integer NOT NULL REFERENCES business (id),
+                start_time timestamp without time zone NOT NULL,
+                finish_time timestamp without time zone NOT NULL
+            )""")
+        op.execute('ALTER SEQUENCE shift_id_seq OWNED BY shift.id')
+        op.execute(f'INSERT INTO shift ({SHIFT_COLUMNS}) SELECT {SHIFT_COLUMNS} FROM shift_partitioned')
+        op.execute(f'INSERT INTO shift ({SHIFT_COLUMNS}) SELECT {SHIFT_COLUMNS} FROM shift_archive')
+        op.execute('DROP TABLE shift_partitioned')
+        _create_shift_indexes()
+        op.execute('ALTER TABLE shift ADD CONSTRAINT ex_shift_employee_id_overlap '
+                   'EXCLUDE USING gist (employee_id WITH =, tsrange(start_time, finish_time) WITH &&)')
+    else:
+        op.execute(f'INSERT INTO shift ({SHIFT_COLUMNS}) SELECT {SHIFT_COLUMNS} FROM shift_archive')
+
+    with op.batch_alter_table('shift_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_shift_archive_start_time')
+        batch_op.drop_index('ix_shift_archive_business_id_start_time')
+        batch_op.drop_index('ix_shift_archive_employee_id_start_time')
+
+    op.drop_table('shift_archive')
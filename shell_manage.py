@@ -1,5 +1,6 @@
-from app import app, db
+from app import db
 from app.models import User
+from main import app
 
 
 @app.shell_context_processor
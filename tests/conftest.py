@@ -0,0 +1,49 @@
+import pytest
+
+from app import create_app, db
+from app.models import Role, User
+from config import Config
+
+
+@pytest.fixture
+def config(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "test.db"}'
+        SQLALCHEMY_BINDS = {}
+        WTF_CSRF_ENABLED = False
+        JOB_FILES_DIR = str(tmp_path / 'jobs')
+        JOB_MAX_ATTEMPTS = 3
+        JOB_RETRY_BACKOFF_SECONDS = 30
+        JOB_LEASE_SECONDS = 60
+
+    return TestConfig
+
+
+@pytest.fixture
+def app(config):
+    app = create_app(config)
+    with app.app_context():
+        # Only the primary: a replica bind, when a test adds one, is the test's to fill.
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """Log the test client in as a new user with the given roles, and return the user."""
+    def login(*role_names):
+        user = User(username='tester', email='tester@example.com',
+                    roles=[Role(name=name) for name in role_names])
+        db.session.add(user)
+        db.session.commit()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+        return user
+    return login
@@ -0,0 +1,35 @@
+from app import admin, db
+from app.models import Employee, Job
+from app.wages import add_employee
+
+
+def test_employee_added_by_a_racing_request_is_a_form_error(app, client, login, monkeypatch):
+    login('Manager')
+    add_employee = admin.add_employee
+
+    def lose_race(firstname, lastname, hourly_rate):
+        # Another request commits the same name after this one's form passed its uniqueness check.
+        with db.engine.begin() as connection:
+            connection.execute(Employee.__table__.insert().values(firstname=firstname, lastname=lastname))
+        return add_employee(firstname, lastname, hourly_rate)
+
+    monkeypatch.setattr(admin, 'add_employee', lose_race)
+    response = client.post('/new_employee', data={'firstname': 'Ann', 'lastname': 'Lee', 'hourly_rate': '12.50'})
+
+    assert response.status_code == 200
+    assert b'Employee with same first and last name already exists.' in response.data
+    assert Employee.query.count() == 1
+
+
+def test_background_wage_refresh_is_visible_to_the_manager_who_queued_it(app, client, login):
+    user_id = login('Manager').id
+    employee = add_employee('Ann', 'Lee', 10)
+    db.session.commit()
+
+    response = client.post(f'/new_wage/{employee.id}', data={'employee_id': employee.id, 'hourly_rate': '12.50',
+                                                              'valid_from': '2022-03-01T00:00', 'is_current': 'y'})
+
+    assert response.status_code == 302
+    job = Job.query.filter_by(kind='refresh_summary').one()
+    assert job.user_id == user_id
+    assert client.get(f'/jobs/{job.id}').status_code == 200
@@ -0,0 +1,25 @@
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+from app import db
+from app.models import Business, Employee, Shift, Wage
+
+
+def test_shift_cost_looks_up_wages_once_per_request(app):
+    employee, business = Employee(firstname='Ann', lastname='Lee'), Business(name='Cafe')
+    db.session.add_all([employee, business])
+    db.session.flush()
+    db.session.add(Wage(employee_id=employee.id, hourly_rate=12.5, valid_from=date(2022, 1, 1), is_current=True))
+    db.session.add_all([Shift(employee_id=employee.id, business_id=business.id,
+                              start_time=datetime(2022, 3, day, 8), finish_time=datetime(2022, 3, day, 16))
+                        for day in range(1, 11)])
+    db.session.commit()
+    shifts = Shift.query.all()
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    with app.test_request_context():
+        assert [shift.shift_cost for shift in shifts] == [100.0] * 10
+    # One version check and one wage query, not one of each per shift.
+    assert len(statements) == 2
@@ -0,0 +1,13 @@
+from app.explain import check_query_plans
+
+
+def test_hot_queries_use_their_indexes(app):
+    failures = [(name, plan) for name, ok, plan in check_query_plans() if not ok]
+    assert failures == []
+
+
+def test_check_indexes_command(app):
+    result = app.test_cli_runner().invoke(args=['shifts', 'check-indexes'])
+    assert result.exit_code == 0, result.output
+    assert 'FAIL' not in result.output
+    assert 'ok   current wage' in result.output
@@ -0,0 +1,29 @@
+import io
+from datetime import datetime
+
+from app import db
+from app.importer import import_shifts, read_records
+from app.models import Business, Employee, Shift
+
+CSV = '''employee_id,business_id,start_time,finish_time
+{employee},{business},2022-03-01 08:00,2022-03-01 16:00
+{employee},{business},2022-03-02T08:00:00+01:00,2022-03-02T16:00:00+01:00
+{employee},{business},2022-03-03T08:00:00Z,2022-03-03T16:00:00Z
+{employee},{business},2022-03-04T08:00:00,2022-03-04T16:00:00
+'''
+
+
+def test_times_with_a_utc_offset_are_rejected_per_row(app):
+    employee, business = Employee(firstname='Ann', lastname='Lee'), Business(name='Cafe')
+    db.session.add_all([employee, business])
+    db.session.commit()
+
+    stream = io.StringIO(CSV.format(employee=employee.id, business=business.id))
+    result = import_shifts(read_records(stream, 'csv'))
+
+    assert result.imported == 2
+    assert result.rejected == 2
+    assert [row for row, _ in result.errors] == [2, 3]
+    assert all('UTC offset' in message for _, message in result.errors)
+    starts = [start for (start,) in db.session.query(Shift.start_time).order_by(Shift.start_time)]
+    assert starts == [datetime(2022, 3, 1, 8), datetime(2022, 3, 4, 8)]
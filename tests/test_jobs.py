@@ -0,0 +1,170 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app import db
+from app.jobs import DONE, FAILED, QUEUED, RUNNING, claim_job, enqueue, job_handler, run_worker
+from app.models import Job
+
+# What the test handlers saw, by job kind.
+calls = {}
+
+
+@job_handler('test_echo')
+def echo_job(payload, progress):
+    calls.setdefault('test_echo', []).append(payload)
+    progress(0.5, 'halfway')
+    return {'echo': payload['value']}
+
+
+@job_handler('test_flaky')
+def flaky_job(payload, progress):
+    # Fails until it has been called `failures` times.
+    attempts = calls.setdefault('test_flaky', [])
+    attempts.append(payload)
+    if len(attempts) <= payload['failures']:
+        raise RuntimeError(f'attempt {len(attempts)} failed')
+    return {'attempts': len(attempts)}
+
+
+def _queue(kind, payload, **kwargs):
+    job = enqueue(kind, payload, **kwargs)
+    db.session.commit()
+    return job.id
+
+
+def _job(job_id):
+    db.session.expire_all()
+    return db.session.get(Job, job_id)
+
+
+def _make_due(job_id):
+    db.session.execute(update(Job).where(Job.id == job_id).values(run_after=datetime.utcnow()))
+    db.session.commit()
+
+
+def setup_function():
+    calls.clear()
+
+
+def test_enqueued_job_is_claimed_and_run(app):
+    job_id = _queue('test_echo', {'value': 42})
+    assert _job(job_id).status == QUEUED
+
+    assert run_worker(processes=0, burst=True) == 1
+
+    job = _job(job_id)
+    assert job.status == DONE
+    assert job.attempts == 1
+    assert job.result == '{"echo": 42}'
+    assert job.progress == 1.0
+    assert job.started_at is not None and job.finished_at is not None
+    assert calls['test_echo'] == [{'value': 42}]
+    # Nothing is left to run.
+    assert run_worker(processes=0, burst=True) == 0
+
+
+def test_job_that_is_not_due_is_not_claimed(app):
+    _queue('test_echo', {'value': 1}, delay=60)
+    assert claim_job('worker-a') is None
+    assert run_worker(processes=0, burst=True) == 0
+
+
+def test_failed_attempt_is_retried_with_backoff(app):
+    job_id = _queue('test_flaky', {'failures': 2})
+
+    started = datetime.utcnow()
+    assert run_worker(processes=0, burst=True) == 1
+    job = _job(job_id)
+    assert job.status == QUEUED
+    assert job.attempts == 1
+    assert 'attempt 1 failed' in job.error
+    assert job.worker is None
+    # JOB_RETRY_BACKOFF_SECONDS after the first failure, and not runnable before then.
+    assert started + timedelta(seconds=29) <= job.run_after <= datetime.utcnow() + timedelta(seconds=30)
+    assert run_worker(processes=0, burst=True) == 0
+
+    _make_due(job_id)
+    started = datetime.utcnow()
+    assert run_worker(processes=0, burst=True) == 1
+    job = _job(job_id)
+    assert job.status == QUEUED
+    assert job.attempts == 2
+    # The backoff doubles with each attempt.
+    assert started + timedelta(seconds=59) <= job.run_after <= datetime.utcnow() + timedelta(seconds=60)
+
+    _make_due(job_id)
+    assert run_worker(processes=0, burst=True) == 1
+    job = _job(job_id)
+    assert job.status == DONE
+    assert job.attempts == 3
+    assert job.error is None
+    assert job.result == '{"attempts": 3}'
+
+
+def test_job_fails_after_max_attempts(app):
+    job_id = _queue('test_flaky', {'failures': 5}, max_attempts=2)
+
+    run_worker(processes=0, burst=True)
+    _make_due(job_id)
+    run_worker(processes=0, burst=True)
+
+    job = _job(job_id)
+    assert job.status == FAILED
+    assert job.attempts == 2
+    assert 'attempt 2 failed' in job.error
+    assert job.finished_at is not None
+    assert run_worker(processes=0, burst=True) == 0
+
+
+def test_expired_lease_is_reclaimed(app):
+    job_id = _queue('test_echo', {'value': 'again'})
+    assert claim_job('crashed-worker') == job_id
+    job = _job(job_id)
+    assert (job.status, job.worker, job.attempts) == (RUNNING, 'crashed-worker', 1)
+
+    # Still leased to the first worker.
+    assert claim_job('worker-b') is None
+
+    # The first worker died without finishing; once JOB_LEASE_SECONDS have passed the job is up for grabs.
+    db.session.execute(update(Job).where(Job.id == job_id)
+                       .values(started_at=datetime.utcnow() - timedelta(seconds=61)))
+    db.session.commit()
+    assert claim_job('worker-b') == job_id
+    job = _job(job_id)
+    assert (job.status, job.worker, job.attempts) == (RUNNING, 'worker-b', 2)
+
+
+def test_a_job_is_claimed_once(app):
+    job_id = _queue('test_echo', {'value': 1})
+    assert claim_job('worker-a') == job_id
+    assert claim_job('worker-b') is None
+
+
+def test_concurrent_workers_never_claim_the_same_job(app):
+    job_ids = {_queue('test_echo', {'value': i}) for i in range(40)}
+    claimed = {'worker-a': [], 'worker-b': [], 'worker-c': []}
+    start = threading.Barrier(len(claimed))
+
+    def work(worker):
+        # Each thread has its own app context, and so its own session and connection.
+        with app.app_context():
+            start.wait()
+            while True:
+                job_id = claim_job(worker)
+                if job_id is None:
+                    break
+                claimed[worker].append(job_id)
+            db.session.remove()
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in claimed]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_claims = [job_id for ids in claimed.values() for job_id in ids]
+    assert sorted(all_claims) == sorted(job_ids)
+    for worker, ids in claimed.items():
+        assert all(_job(job_id).worker == worker for job_id in ids)
@@ -0,0 +1,25 @@
+import pytest
+
+from app import db
+from app.models import Job
+
+
+@pytest.fixture
+def config(config, tmp_path):
+    # A read replica that has not caught up with any of the primary's writes.
+    config.SQLALCHEMY_BINDS = {'replica': f'sqlite:///{tmp_path / "replica.db"}'}
+    return config
+
+
+def test_background_export_does_not_read_its_job_from_the_replica(app, client, login):
+    user_id = login().id
+    db.metadata.create_all(db.engines['replica'])
+
+    response = client.get('/export/shifts.csv?background=1')
+
+    assert response.status_code == 202
+    # A fresh app context, so this lookup isn't routed to the replica too.
+    with app.app_context():
+        job = db.session.get(Job, response.json['id'])
+    assert (job.kind, job.status, job.user_id) == ('export_shifts', 'queued', user_id)
+    assert response.headers['Location'] == response.json['status_url'] == f'/jobs/{job.id}'
@@ -0,0 +1,25 @@
+from datetime import date
+
+from app import db
+from app.models import Business, Employee, Shift, Wage
+
+
+def test_booking_rejected_at_flush_is_a_form_error(app, client, login):
+    login('Manager')
+    employee, business = Employee(firstname='Ann', lastname='Lee'), Business(name='Cafe')
+    db.session.add_all([employee, business])
+    db.session.flush()
+    db.session.add(Wage(employee_id=employee.id, hourly_rate=12.5, valid_from=date(2022, 1, 1), is_current=True))
+    db.session.commit()
+    # Stands in for the PostgreSQL exclusion constraint rejecting a booking that
+    # raced past the form's overlap check: the INSERT fails when it is flushed.
+    db.session.execute(db.text("CREATE TRIGGER lost_race BEFORE INSERT ON shift "
+                               "BEGIN SELECT RAISE(ABORT, 'conflicting key value violates exclusion constraint'); END"))
+    db.session.commit()
+
+    response = client.post('/new_shift', data={'employee_id': employee.id, 'business_id': business.id,
+                                               'start_time': '2022-03-01T08:00', 'finish_time': '2022-03-01T16:00'})
+
+    assert response.status_code == 200
+    assert b'Employee is already booked at this time.' in response.data
+    assert Shift.query.count() == 0
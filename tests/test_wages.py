@@ -0,0 +1,57 @@
+import threading
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Employee, Wage
+from app.wages import add_employee, add_wage, commit_wage_change
+
+
+def test_concurrent_current_wages_leave_one_current_wage(app):
+    employee = add_employee('Ann', 'Lee', 10)
+    db.session.commit()
+    employee_id = employee.id
+    writers = 6
+    attempts = {writer: 0 for writer in range(writers)}
+    errors = []
+    start = threading.Barrier(writers)
+
+    def change(writer):
+        attempts[writer] += 1
+        wage = add_wage(employee_id, hourly_rate=11 + writer,
+                        valid_from=datetime.now() - timedelta(seconds=writer), is_current=True)
+        if writer % 2 and attempts[writer] == 1:
+            # SQLite serializes writers, so stage the race PostgreSQL allows: a
+            # current wage committed after this transaction's demoting UPDATE ran.
+            try:
+                db.session.add(Wage(employee_id=employee_id, hourly_rate=99, valid_from=date(2022, 1, 1),
+                                    is_current=True))
+                db.session.flush()
+            except IntegrityError as error:
+                errors.append(error)
+                raise
+        return wage
+
+    def write(writer):
+        # Each thread has its own app context, and so its own session and connection.
+        with app.app_context():
+            start.wait()
+            commit_wage_change(lambda: change(writer))
+            db.session.remove()
+
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The unique index rejected each staged race, and commit_wage_change retried it.
+    assert len(errors) == writers // 2
+    assert all('wage.employee_id' in str(error.orig) for error in errors)
+    assert attempts == {writer: 2 if writer % 2 else 1 for writer in range(writers)}
+    current = db.session.query(func.count(Wage.id)).filter(Wage.employee_id == employee_id, Wage.is_current)
+    assert current.scalar() == 1
+    assert db.session.query(func.count(Wage.id)).filter(Wage.employee_id == employee_id).scalar() == writers + 1
+    assert db.session.query(func.count(Employee.id)).scalar() == 1